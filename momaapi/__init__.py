@@ -1,2 +1,32 @@
+import importlib
+
+from .version import __version__
 from .moma import MOMA
-from .visualizers import *
+
+"""
+The visualizers are imported on first access, e.g., of momaapi.AnnVisualizer, along with their
+plotting dependencies (Matplotlib, seaborn, torchvision, pygraphviz, distinctipy and SciPy), so
+that importing MOMA only requires NumPy.
+"""
+
+_visualizers = [
+    "AnnVisualizer",
+    "StatVisualizer",
+    "TimelineVisualizer",
+    "distance",
+    "get_dist_per_class",
+    "get_dist_overall",
+]
+
+__all__ = ["__version__", "MOMA"] + _visualizers
+
+
+def __getattr__(name):
+    if name in _visualizers:
+        visualizers = importlib.import_module(".visualizers", __name__)
+        return getattr(visualizers, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + _visualizers)
@@ -0,0 +1,350 @@
+import copy
+import json
+import os.path as osp
+
+import numpy as np
+
+from .data import (
+    Buffer,
+    DictView,
+    expand_groups,
+    get_children,
+    get_children_grouped,
+    hash_rows,
+)
+from .utils import load_or_compile, open_atomic
+
+"""
+Joint class counts of the MOMA hierarchy, e.g., for priors and loss re-weighting:
+ - 'actor_object': (actor class, object class) -> the number of higher-order interactions in
+   which an actor and an object of the two classes co-occur
+ - 'triple': (entity class, relationship class, entity class) -> the number of relationships
+   of a class from a source entity to a target entity of the given classes
+ - 'att_entity': (attribute class, entity class) -> the number of attributes of a class of
+   entities of a class
+ - 'sact_entity': (sub-activity class, entity class) -> the number of sub-activities of a class
+   in which an entity of a class appears
+ - 'sact_bigram': (sub-activity class, sub-activity class) -> the number of times that a
+   sub-activity of the second class directly follows one of the first class in an activity
+
+Entity classes index actor classes first, followed by object classes (see
+Cooccurrences.cnames_entity).
+
+Counts are kept as SparseCounts, which can be converted into dense NumPy arrays or, if SciPy
+is installed, into SciPy sparse matrices. They are aggregated from the columns of the Lookup
+cache in a single pass for the entire dataset and every dataset split, and cached in
+anns/cache/cooccurrences.npz.
+"""
+
+kinds = ["actor_object", "triple", "att_entity", "sact_entity", "sact_bigram"]
+
+
+class SparseCounts:
+    """
+    Counts held in the coordinate (COO) format, where the coordinates of non-zero counts are
+    sorted in row-major order.
+
+    :ivar coords: the coordinates of the non-zero counts, one row per dimension
+    :ivar counts: the non-zero counts
+    :ivar shape: the shape of the dense array of counts
+    """
+
+    def __init__(self, coords, counts, shape):
+        self.coords = coords
+        self.counts = counts
+        self.shape = tuple(shape)
+
+    @property
+    def nnz(self):
+        return len(self.counts)
+
+    def toarray(self):
+        """
+        :return: the counts as a dense NumPy array
+        :rtype: numpy.ndarray
+        """
+        array = np.zeros(self.shape, dtype=np.int64)
+        array[tuple(self.coords)] = self.counts
+        return array
+
+    def tocoo(self):
+        """
+        :return: two-dimensional counts as a SciPy sparse matrix, which requires SciPy
+        :rtype: scipy.sparse.coo_matrix
+        """
+        # SciPy is an optional dependency
+        from scipy.sparse import coo_matrix
+
+        assert len(self.shape) == 2
+        return coo_matrix((self.counts, (self.coords[0], self.coords[1])), self.shape)
+
+    def __repr__(self):
+        return f"SparseCounts(shape={self.shape}, nnz={self.nnz})"
+
+
+def _count_sparse(groups, coords, shape, num_groups):
+    """
+    Counts the occurrences of coordinates in each group
+    """
+    size = int(np.prod(shape))
+    indices = np.ravel_multi_index(tuple(coords), shape) if len(groups) > 0 else groups
+    keys, counts = np.unique(groups * size + indices, return_counts=True)
+    groups, indices = np.divmod(keys, size)
+    bounds = np.searchsorted(groups, np.arange(num_groups + 1))
+    return [
+        SparseCounts(
+            np.stack(np.unravel_index(indices[start:end], shape)).reshape(
+                len(shape), -1
+            ),
+            counts[start:end],
+            shape,
+        )
+        for start, end in zip(bounds[:-1], bounds[1:])
+    ]
+
+
+class Cooccurrences(DictView):
+    def __init__(self, dir_moma, taxonomy, lookup, reset_cache, max_cache_entries=64):
+        super().__init__()
+        self._taxonomy = taxonomy
+        self._lookup = lookup
+        self._buffer = Buffer(max_entries=max_cache_entries)
+        self.cnames_entity = list(taxonomy["actor"]) + list(taxonomy["object"])
+
+        num_entities = len(self.cnames_entity)
+        self.shapes = {
+            "actor_object": (len(taxonomy["actor"]), len(taxonomy["object"])),
+            "triple": (num_entities, len(taxonomy["rel"]), num_entities),
+            "att_entity": (len(taxonomy["att"]), num_entities),
+            "sact_entity": (len(taxonomy["sact"]), num_entities),
+            "sact_bigram": (len(taxonomy["sact"]), len(taxonomy["sact"])),
+        }
+        self.cooccurrences = self._read_cooccurrences(dir_moma, reset_cache)
+
+    def compute(self, ids_act=None, ids_sact=None, ids_hoi=None, cache=True):
+        """
+        Computes co-occurrences for a subset of instances, which is closed over the MOMA
+        hierarchy as in ``Lookup.get_subset()``
+
+        :param ids_act: string activity IDs or a NumPy array of dense activity IDs
+        :param ids_sact: string sub-activity IDs or a NumPy array of dense sub-activity IDs
+        :param ids_hoi: string higher-order interaction IDs or a NumPy array of dense IDs
+        :param cache: whether to reuse the co-occurrences computed for the same subset, which
+          are keyed by a hash of the subset
+        :type cache: bool
+        :return: a dictionary that maps each kind of co-occurrence to its counts
+        :rtype: dict[str, SparseCounts]
+        """
+        rows_act, rows_sact, rows_hoi = self._lookup.get_subset(
+            ids_act, ids_sact, ids_hoi
+        )
+
+        key = None
+        if cache:
+            key = hash_rows(rows_act, rows_sact, rows_hoi)
+            cooccurrences = self._buffer.get(key)
+            if cooccurrences is not None:
+                return copy.deepcopy(cooccurrences)
+
+        cooccurrences = self._get_cooccurrences([rows_act], [rows_sact], [rows_hoi])[0]
+
+        if cache:
+            self._buffer.put(key, copy.deepcopy(cooccurrences), 1)
+        return cooccurrences
+
+    def _save_cache(self, path_cooccurrences, cooccurrences):
+        header = {"fingerprint": self._lookup.fingerprint, "keys": list(cooccurrences)}
+        arrays = {}
+        for key, cooccurrences_key in cooccurrences.items():
+            for kind, counts in cooccurrences_key.items():
+                arrays[f"{key}.{kind}.coords"] = counts.coords
+                arrays[f"{key}.{kind}.counts"] = counts.counts
+
+        with open_atomic(path_cooccurrences, "wb") as f:
+            np.savez(f, header=np.array(json.dumps(header)), **arrays)
+
+    def _load_cache(self, path_cooccurrences):
+        with np.load(path_cooccurrences) as cache:
+            header = json.loads(cache["header"].item())
+
+            # co-occurrences from different sources or from an older API are stale
+            if header.get("fingerprint") != self._lookup.fingerprint:
+                return None
+
+            cooccurrences = {}
+            for key in header["keys"]:
+                cooccurrences[key] = {
+                    kind: SparseCounts(
+                        cache[f"{key}.{kind}.coords"],
+                        cache[f"{key}.{kind}.counts"],
+                        self.shapes[kind],
+                    )
+                    for kind in kinds
+                }
+        return cooccurrences
+
+    def _compile(self):
+        keys = ["all"] + [
+            f"{paradigm}_{split}"
+            for paradigm in self._lookup.retrieve("paradigms")
+            for split in self._lookup.retrieve("splits")
+        ]
+        rows_act = [self._lookup.retrieve("ids_act", dense=True)] + [
+            self._lookup.retrieve("ids_act", key, dense=True) for key in keys[1:]
+        ]
+        return dict(zip(keys, self._get_cooccurrences(rows_act)))
+
+    def _read_cooccurrences(self, dir_moma, reset_cache):
+        path_cooccurrences = osp.join(dir_moma, "anns/cache/cooccurrences.npz")
+
+        return load_or_compile(
+            path_cooccurrences,
+            reset_cache,
+            self._load_cache,
+            self._compile,
+            self._save_cache,
+            "Cooccurrences",
+        )
+
+    def _get_classes_entity(self, rows_entity):
+        """
+        :return: the classes of entities, where object classes follow actor classes
+        """
+        columns = self._lookup.columns
+        is_object = columns["entity_kind"][rows_entity] == 1
+        return columns["entity_cid"][rows_entity] + is_object * len(
+            self._taxonomy["actor"]
+        )
+
+    def _get_cooccurrences(self, rows_act, rows_sact=None, rows_hoi=None):
+        """
+        Counts the co-occurrences of groups of instances in a single pass over the columns.
+        Groups are expanded over the MOMA hierarchy with ``expand_groups()``.
+
+        :param rows_act: the dense IDs of the activities in each group
+        :type rows_act: list[numpy.ndarray]
+        :param rows_sact: the dense IDs of the sub-activities in each group
+        :type rows_sact: Optional[list[numpy.ndarray]]
+        :param rows_hoi: the dense IDs of the higher-order interactions in each group
+        :type rows_hoi: Optional[list[numpy.ndarray]]
+        :return: the co-occurrences of each group
+        :rtype: list[dict[str, SparseCounts]]
+        """
+        columns = self._lookup.columns
+        num_groups = len(rows_act)
+        _, (groups_sact, rows_sact), (groups_hoi, rows_hoi) = expand_groups(
+            columns, rows_act, rows_sact, rows_hoi
+        )
+
+        offsets = columns["hoi_entity_offsets"]
+        groups_entity, rows_entity = get_children_grouped(offsets, groups_hoi, rows_hoi)
+        indices_hoi = np.repeat(
+            np.arange(len(rows_hoi)), offsets[rows_hoi + 1] - offsets[rows_hoi]
+        )
+        classes_entity = self._get_classes_entity(rows_entity)
+        counts = {}
+
+        # actor × object: every actor is paired with the objects of its HOI, which are
+        # grouped by HOI, and each pair of classes is counted once per HOI
+        is_actor = columns["entity_kind"][rows_entity] == 0
+        indices_actor = np.flatnonzero(is_actor)
+        indices_object = np.flatnonzero(~is_actor)
+        offsets_object = np.zeros(len(rows_hoi) + 1, dtype=np.int64)
+        np.cumsum(
+            np.bincount(indices_hoi[indices_object], minlength=len(rows_hoi)),
+            out=offsets_object[1:],
+        )
+        indices_hoi_actor = indices_hoi[indices_actor]
+        lengths = (
+            offsets_object[indices_hoi_actor + 1] - offsets_object[indices_hoi_actor]
+        )
+        indices_object = indices_object[get_children(offsets_object, indices_hoi_actor)]
+        indices_actor = np.repeat(indices_actor, lengths)
+
+        num_actors, num_objects = self.shapes["actor_object"]
+        cids_entity = columns["entity_cid"][rows_entity]
+        pairs = np.unique(
+            (indices_hoi[indices_actor] * num_actors + cids_entity[indices_actor])
+            * num_objects
+            + cids_entity[indices_object]
+        )
+        indices_pair, pairs = np.divmod(pairs, num_actors * num_objects)
+        counts["actor_object"] = _count_sparse(
+            groups_hoi[indices_pair],
+            np.unravel_index(pairs, self.shapes["actor_object"]),
+            self.shapes["actor_object"],
+            num_groups,
+        )
+
+        # (source entity, relationship, target entity)
+        groups_rel, rows_rel = get_children_grouped(
+            columns["hoi_rel_offsets"], groups_hoi, rows_hoi
+        )
+        rows_src = columns["rel_src_entity"][rows_rel]
+        rows_trg = columns["rel_trg_entity"][rows_rel]
+        is_valid = (rows_src >= 0) & (rows_trg >= 0)
+        counts["triple"] = _count_sparse(
+            groups_rel[is_valid],
+            (
+                self._get_classes_entity(rows_src[is_valid]),
+                columns["rel_cid"][rows_rel[is_valid]],
+                self._get_classes_entity(rows_trg[is_valid]),
+            ),
+            self.shapes["triple"],
+            num_groups,
+        )
+
+        # attribute × entity
+        groups_att, rows_att = get_children_grouped(
+            columns["hoi_att_offsets"], groups_hoi, rows_hoi
+        )
+        rows_src = columns["att_entity"][rows_att]
+        is_valid = rows_src >= 0
+        counts["att_entity"] = _count_sparse(
+            groups_att[is_valid],
+            (
+                columns["att_cid"][rows_att[is_valid]],
+                self._get_classes_entity(rows_src[is_valid]),
+            ),
+            self.shapes["att_entity"],
+            num_groups,
+        )
+
+        # sub-activity × entity: each class of entities is counted once per sub-activity
+        num_sacts, num_entities = len(columns["sact_id"]), len(self.cnames_entity)
+        rows_sact_entity = columns["hoi_sact"][rows_hoi[indices_hoi]]
+        pairs = np.unique(
+            (groups_entity * num_sacts + rows_sact_entity) * num_entities
+            + classes_entity
+        )
+        pairs, classes = np.divmod(pairs, num_entities)
+        groups, rows = np.divmod(pairs, num_sacts)
+        counts["sact_entity"] = _count_sparse(
+            groups,
+            (columns["sact_cid"][rows], classes),
+            self.shapes["sact_entity"],
+            num_groups,
+        )
+
+        # bigrams of sub-activities, which are ordered by start time within activities
+        ranks = np.argsort(columns["sact_by_start"])
+        order = np.lexsort((ranks[rows_sact], groups_sact))
+        groups, rows = groups_sact[order], rows_sact[order]
+        rows_act_sact = columns["sact_act"][rows]
+        is_bigram = (groups[1:] == groups[:-1]) & (
+            rows_act_sact[1:] == rows_act_sact[:-1]
+        )
+        counts["sact_bigram"] = _count_sparse(
+            groups[1:][is_bigram],
+            (
+                columns["sact_cid"][rows[:-1][is_bigram]],
+                columns["sact_cid"][rows[1:][is_bigram]],
+            ),
+            self.shapes["sact_bigram"],
+            num_groups,
+        )
+
+        return [{kind: counts[kind][i] for kind in kinds} for i in range(num_groups)]
+
+    def _get_data(self):
+        return self.cooccurrences
@@ -1,2 +1,13 @@
 from .ann import Metadatum, Act, SAct, HOI, Clip, BBox, Entity, Predicate
-from .dicts import Bidict, OrderedBidict, LazyDict
+from .dicts import Bidict, OrderedBidict, Buffer, DictView, LazyDict, LazyDictWriter
+from .columns import (
+    ColumnWriter,
+    ColumnStore,
+    ColumnDict,
+    get_children,
+    get_children_grouped,
+    concatenate_groups,
+    expand_groups,
+    hash_rows,
+)
+from .files import FileManifest
@@ -0,0 +1,669 @@
+import hashlib
+import os
+import os.path as osp
+
+import numpy as np
+
+from .ann import SAct, HOI, Clip
+
+"""
+A columnar, memory-mapped annotation store. Each level of the MOMA hierarchy is flattened
+into NumPy arrays that are saved as one .npy file per column:
+ - act_*: one row per activity
+ - sact_*: one row per sub-activity, grouped by activity (act_sact_offsets)
+ - hoi_*: one row per higher-order interaction, grouped by sub-activity (sact_hoi_offsets)
+ - entity_*, att_*, rel_*: one row per entity/predicate, grouped by HOI (hoi_*_offsets)
+ - clip_*: one row per clip, whose neighbors are grouped by clip (clip_neighbor_offsets)
+
+Besides annotations, act_duration_raw holds the duration of each video, and sact_num_actors
+and sact_num_objects the number of distinct actors and objects in each sub-activity, so that
+statistics are aggregated from columns alone. att_entity, rel_src_entity and rel_trg_entity
+hold the rows of the entities that predicates refer to, or -1 if they are not in the HOI.
+
+Rows double as dense integer instance IDs. The hierarchy is held by the parent arrays
+sact_act and hoi_sact, and by the CSR child offsets act_sact_offsets, sact_hoi_offsets and
+act_hoi_offsets, which rely on children being grouped by parent.
+
+Temporal indexes are grouped by activity (act_sact_offsets and act_hoi_offsets):
+ - sact_by_start: the rows of sub-activities sorted by start time, with sact_end_max holding
+   the running maximum of their end times
+ - hoi_by_time: the rows of higher-order interactions sorted by time
+The rows of higher-order interactions are also sorted by time per sub-activity
+(hoi_by_sact_time, grouped by sact_hoi_offsets).
+
+For each kind in ['act', 'sact', 'hoi'] and each dataset split, {kind}_split_{paradigm}_{split}
+holds the sorted rows of the instances in that split.
+
+For each kind in ['act', 'sact', 'hoi', 'clip'], {kind}_keys holds the sorted instance IDs and
+{kind}_rows the matching rows so that an ID can be located by binary search.
+
+For each kind in ['act', 'sact', 'actor', 'object', 'att', 'rel'], index_{kind}_rows holds
+inverted indexes that map a class ID to the sorted rows of the instances annotated with it,
+grouped by class (index_{kind}_offsets). Actor, object, attribute and relationship classes
+map to rows of higher-order interactions.
+"""
+
+kinds_entity = ["actor", "object"]
+
+
+def get_children(offsets, rows):
+    """
+    Returns the rows of the children of the given rows, concatenated in order, from CSR offsets
+    """
+    starts, ends = offsets[rows], offsets[rows + 1]
+    lengths = ends - starts
+    shifts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return shifts + np.arange(lengths.sum())
+
+
+def concatenate_groups(rows):
+    """
+    Concatenates groups of rows, and labels each row with the index of its group
+    """
+    groups = np.repeat(np.arange(len(rows)), [len(x) for x in rows])
+    return groups, np.concatenate(rows).astype(np.int64)
+
+
+def get_children_grouped(offsets, groups, rows):
+    """
+    Returns the rows of the children of the given rows from CSR offsets, labeled with the
+    groups of their parents
+    """
+    rows_child = get_children(offsets, rows)
+    return np.repeat(groups, offsets[rows + 1] - offsets[rows]), rows_child
+
+
+def expand_groups(columns, rows_act, rows_sact=None, rows_hoi=None):
+    """
+    Concatenates groups of instances, and labels each instance with the index of its group.
+    The sub-activities and higher-order interactions of a group default to those within its
+    activities and sub-activities, respectively.
+
+    :param columns: the columns of the Lookup cache
+    :param rows_act: the dense IDs of the activities in each group
+    :type rows_act: list[numpy.ndarray]
+    :param rows_sact: the dense IDs of the sub-activities in each group
+    :type rows_sact: Optional[list[numpy.ndarray]]
+    :param rows_hoi: the dense IDs of the higher-order interactions in each group
+    :type rows_hoi: Optional[list[numpy.ndarray]]
+    :return: the groups and rows of activities, sub-activities and higher-order interactions
+    :rtype: tuple[tuple[numpy.ndarray, numpy.ndarray], ...]
+    """
+    groups_act, rows_act = concatenate_groups(rows_act)
+    if rows_sact is None:
+        groups_sact, rows_sact = get_children_grouped(
+            columns["act_sact_offsets"], groups_act, rows_act
+        )
+    else:
+        groups_sact, rows_sact = concatenate_groups(rows_sact)
+    if rows_hoi is None:
+        groups_hoi, rows_hoi = get_children_grouped(
+            columns["sact_hoi_offsets"], groups_sact, rows_sact
+        )
+    else:
+        groups_hoi, rows_hoi = concatenate_groups(rows_hoi)
+    return (groups_act, rows_act), (groups_sact, rows_sact), (groups_hoi, rows_hoi)
+
+
+def hash_rows(*rows):
+    """
+    Returns a digest that identifies the given arrays of rows
+    """
+    digest = hashlib.sha1()
+    digest.update(np.array([len(x) for x in rows], dtype=np.int64).tobytes())
+    for x in rows:
+        digest.update(np.asarray(x, dtype=np.int64).tobytes())
+    return digest.hexdigest()
+
+
+class ColumnWriter:
+    """
+    Accumulates raw annotations activity by activity and saves them as columns. Rows are
+    flushed to typed chunk files in ``dir_chunks`` every ``num_acts_per_chunk`` activities,
+    and the chunks are concatenated when saving.
+    """
+
+    # bumped whenever the set or the layout of the columns changes
+    version = 9
+
+    def __init__(self, taxonomy, dir_chunks, num_acts_per_chunk=256):
+        self.cname_to_cid = {
+            kind: {cname: cid for cid, cname in enumerate(taxonomy[kind])}
+            for kind in ["act", "sact", "actor", "object"]
+        }
+        self.cname_to_cid.update(
+            {
+                kind: {x[0]: cid for cid, x in enumerate(taxonomy[kind])}
+                for kind in ["att", "rel"]
+            }
+        )
+        self.columns = {
+            "act_id": [],
+            "act_cid": [],
+            "act_start": [],
+            "act_end": [],
+            "act_scale_factor": [],
+            "act_duration_raw": [],
+            "act_num_sacts": [],
+            "sact_id": [],
+            "sact_cid": [],
+            "sact_start": [],
+            "sact_end": [],
+            "sact_act": [],
+            "sact_num_hois": [],
+            "sact_num_actors": [],
+            "sact_num_objects": [],
+            "hoi_id": [],
+            "hoi_time": [],
+            "hoi_sact": [],
+            "hoi_num_entities": [],
+            "hoi_num_atts": [],
+            "hoi_num_rels": [],
+            "entity_id": [],
+            "entity_kind": [],
+            "entity_cid": [],
+            "entity_bbox": [],
+            "att_src": [],
+            "att_entity": [],
+            "att_cid": [],
+            "rel_src": [],
+            "rel_trg": [],
+            "rel_src_entity": [],
+            "rel_trg_entity": [],
+            "rel_cid": [],
+            "clip_hoi": [],
+            "clip_num_neighbors": [],
+            "clip_neighbor_fname": [],
+            "clip_neighbor_time": [],
+        }
+        # rows of each column already written to chunk files
+        self.num_rows = {name: 0 for name in self.columns}
+        self.num_acts_per_chunk = num_acts_per_chunk
+        self.num_chunks = 0
+        self.dir_chunks = dir_chunks
+
+    def add(self, ann_raw, scale_factor, info_clips=None):
+        columns = self.columns
+        ann_act_raw = ann_raw["activity"]
+        row_act = self._get_row("act_id")
+        columns["act_id"].append(ann_act_raw["id"])
+        columns["act_cid"].append(self.cname_to_cid["act"][ann_act_raw["class_name"]])
+        columns["act_start"].append(ann_act_raw["start_time"])
+        columns["act_end"].append(ann_act_raw["end_time"])
+        columns["act_scale_factor"].append(scale_factor)
+        columns["act_duration_raw"].append(ann_raw["duration"])
+        columns["act_num_sacts"].append(len(ann_act_raw["sub_activities"]))
+
+        for ann_sact_raw in ann_act_raw["sub_activities"]:
+            row_sact = self._get_row("sact_id")
+            columns["sact_id"].append(ann_sact_raw["id"])
+            columns["sact_cid"].append(
+                self.cname_to_cid["sact"][ann_sact_raw["class_name"]]
+            )
+            columns["sact_start"].append(ann_sact_raw["start_time"])
+            columns["sact_end"].append(ann_sact_raw["end_time"])
+            columns["sact_act"].append(row_act)
+            columns["sact_num_hois"].append(
+                len(ann_sact_raw["higher_order_interactions"])
+            )
+            for kind_entity in kinds_entity:
+                ids_entity = set(
+                    x["id"]
+                    for ann_hoi_raw in ann_sact_raw["higher_order_interactions"]
+                    for x in ann_hoi_raw[f"{kind_entity}s"]
+                )
+                columns[f"sact_num_{kind_entity}s"].append(len(ids_entity))
+
+            for ann_hoi_raw in ann_sact_raw["higher_order_interactions"]:
+                row_hoi = self._get_row("hoi_id")
+                columns["hoi_id"].append(ann_hoi_raw["id"])
+                columns["hoi_time"].append(ann_hoi_raw["time"])
+                columns["hoi_sact"].append(row_sact)
+                columns["hoi_num_entities"].append(
+                    len(ann_hoi_raw["actors"]) + len(ann_hoi_raw["objects"])
+                )
+                columns["hoi_num_atts"].append(len(ann_hoi_raw["attributes"]))
+                columns["hoi_num_rels"].append(len(ann_hoi_raw["relationships"]))
+
+                id_entity_to_row = {}
+                for kind_entity in kinds_entity:
+                    for x in ann_hoi_raw[f"{kind_entity}s"]:
+                        id_entity_to_row[x["id"]] = self._get_row("entity_id")
+                        columns["entity_id"].append(x["id"])
+                        columns["entity_kind"].append(kinds_entity.index(kind_entity))
+                        columns["entity_cid"].append(
+                            self.cname_to_cid[kind_entity][x["class_name"]]
+                        )
+                        columns["entity_bbox"].append(x["bbox"])
+                for x in ann_hoi_raw["attributes"]:
+                    columns["att_src"].append(x["source_id"])
+                    columns["att_entity"].append(
+                        id_entity_to_row.get(x["source_id"], -1)
+                    )
+                    columns["att_cid"].append(self.cname_to_cid["att"][x["class_name"]])
+                for x in ann_hoi_raw["relationships"]:
+                    columns["rel_src"].append(x["source_id"])
+                    columns["rel_trg"].append(x["target_id"])
+                    columns["rel_src_entity"].append(
+                        id_entity_to_row.get(x["source_id"], -1)
+                    )
+                    columns["rel_trg_entity"].append(
+                        id_entity_to_row.get(x["target_id"], -1)
+                    )
+                    columns["rel_cid"].append(self.cname_to_cid["rel"][x["class_name"]])
+
+                # Currently, only clips from the test set have been generated
+                if info_clips is not None and ann_hoi_raw["id"] in info_clips:
+                    neighbors = info_clips[ann_hoi_raw["id"]]
+                    columns["clip_hoi"].append(row_hoi)
+                    columns["clip_num_neighbors"].append(len(neighbors))
+                    columns["clip_neighbor_fname"] += [x[0] for x in neighbors]
+                    columns["clip_neighbor_time"] += [x[1] for x in neighbors]
+
+        if len(columns["act_id"]) >= self.num_acts_per_chunk:
+            self._flush()
+
+    def _get_row(self, name):
+        return self.num_rows[name] + len(self.columns[name])
+
+    @staticmethod
+    def _to_array(name, values):
+        if name.endswith("_id") or name.endswith("_src") or name.endswith("_trg"):
+            return np.array(values, dtype=str)
+        elif name == "clip_neighbor_fname":
+            return np.array(values, dtype=str)
+        elif name == "entity_bbox":
+            return np.array(values).reshape(-1, 4)
+        elif name == "entity_kind":
+            return np.array(values, dtype=np.int8)
+        elif name.endswith("_cid") or name in ["sact_act", "hoi_sact", "clip_hoi"]:
+            return np.array(values, dtype=np.int64)
+        elif "_num_" in name or name.endswith("_entity"):
+            return np.array(values, dtype=np.int64)
+        else:
+            return np.array(values) if len(values) > 0 else np.zeros(0)
+
+    def _flush(self):
+        """
+        Writes the rows added since the last flush to one typed chunk file per column, so that
+        the rows of at most ``num_acts_per_chunk`` activities are held as Python objects
+        """
+        os.makedirs(self.dir_chunks, exist_ok=True)
+        for name, values in self.columns.items():
+            path = osp.join(self.dir_chunks, f"{name}.{self.num_chunks}.npy")
+            np.save(path, self._to_array(name, values))
+            self.num_rows[name] += len(values)
+            values.clear()
+        self.num_chunks += 1
+
+    def _join(self, name):
+        """
+        Concatenates the chunks of a column, removing the chunk files
+        """
+        chunks = []
+        for i in range(self.num_chunks):
+            path = osp.join(self.dir_chunks, f"{name}.{i}.npy")
+            chunks.append(np.load(path))
+            os.remove(path)
+        # empty chunks are dropped so that they do not change the type of the column
+        chunks_nonempty = [chunk for chunk in chunks if len(chunk) > 0]
+        if len(chunks_nonempty) == 0:
+            return chunks[0]
+        return np.concatenate(chunks_nonempty)
+
+    def save(self, dir_columns, paradigm_and_split_to_ids_act):
+        os.makedirs(dir_columns, exist_ok=True)
+        self._flush()
+
+        offsets_to_counts = [
+            ("act_sact_offsets", "act_num_sacts"),
+            ("sact_hoi_offsets", "sact_num_hois"),
+            ("hoi_entity_offsets", "hoi_num_entities"),
+            ("hoi_att_offsets", "hoi_num_atts"),
+            ("hoi_rel_offsets", "hoi_num_rels"),
+            ("clip_neighbor_offsets", "clip_num_neighbors"),
+        ]
+
+        arrays = {name: self._join(name) for name in self.columns}
+        counts = {name: arrays.pop(name) for _, name in offsets_to_counts}
+        os.rmdir(self.dir_chunks)
+
+        # CSR offset tables
+        for name_offsets, name_counts in offsets_to_counts:
+            offsets = np.zeros(len(counts[name_counts]) + 1, dtype=np.int64)
+            np.cumsum(counts[name_counts], out=offsets[1:])
+            arrays[name_offsets] = offsets
+        arrays["act_hoi_offsets"] = arrays["sact_hoi_offsets"][
+            arrays["act_sact_offsets"]
+        ]
+
+        # sorted keys for binary search
+        for kind, ids in [
+            ("act", arrays["act_id"]),
+            ("sact", arrays["sact_id"]),
+            ("hoi", arrays["hoi_id"]),
+            ("clip", arrays["hoi_id"][arrays["clip_hoi"]]),
+        ]:
+            rows = np.argsort(ids, kind="stable")
+            arrays[f"{kind}_keys"] = ids[rows]
+            arrays[f"{kind}_rows"] = rows
+
+        # temporal indexes
+        rows = np.lexsort((arrays["sact_start"], arrays["sact_act"]))
+        arrays["sact_by_start"] = rows
+        ends = arrays["sact_end"][rows]
+        offsets = arrays["act_sact_offsets"]
+        arrays["sact_end_max"] = np.concatenate(
+            [np.zeros(0)]
+            + [
+                np.maximum.accumulate(ends[offsets[i] : offsets[i + 1]])
+                for i in range(len(offsets) - 1)
+            ]
+        )
+        arrays["hoi_by_time"] = np.lexsort(
+            (arrays["hoi_time"], arrays["sact_act"][arrays["hoi_sact"]])
+        )
+        arrays["hoi_by_sact_time"] = np.lexsort(
+            (arrays["hoi_time"], arrays["hoi_sact"])
+        )
+
+        # split membership; children of sorted rows are sorted since they are grouped by
+        # parent
+        id_act_to_row = {id_act: row for row, id_act in enumerate(arrays["act_id"])}
+        for key, ids_act in paradigm_and_split_to_ids_act.items():
+            rows = np.array(
+                sorted(
+                    id_act_to_row[id_act]
+                    for id_act in ids_act
+                    if id_act in id_act_to_row
+                ),
+                dtype=np.int64,
+            )
+            arrays[f"act_split_{key}"] = rows
+            arrays[f"sact_split_{key}"] = get_children(arrays["act_sact_offsets"], rows)
+            arrays[f"hoi_split_{key}"] = get_children(arrays["act_hoi_offsets"], rows)
+
+        # inverted indexes
+        rows_act = np.arange(len(arrays["act_id"]))
+        rows_sact = np.arange(len(arrays["sact_id"]))
+        rows_hoi = np.arange(len(arrays["hoi_id"]))
+        rows_hoi_entity = np.repeat(rows_hoi, counts["hoi_num_entities"])
+        is_actor = arrays["entity_kind"] == kinds_entity.index("actor")
+        for kind, cids, rows in [
+            ("act", arrays["act_cid"], rows_act),
+            ("sact", arrays["sact_cid"], rows_sact),
+            ("actor", arrays["entity_cid"][is_actor], rows_hoi_entity[is_actor]),
+            ("object", arrays["entity_cid"][~is_actor], rows_hoi_entity[~is_actor]),
+            (
+                "att",
+                arrays["att_cid"],
+                np.repeat(rows_hoi, counts["hoi_num_atts"]),
+            ),
+            (
+                "rel",
+                arrays["rel_cid"],
+                np.repeat(rows_hoi, counts["hoi_num_rels"]),
+            ),
+        ]:
+            offsets, rows = self._get_postings(cids, rows, len(self.cname_to_cid[kind]))
+            arrays[f"index_{kind}_offsets"] = offsets
+            arrays[f"index_{kind}_rows"] = rows
+
+        for name, array in arrays.items():
+            np.save(osp.join(dir_columns, f"{name}.npy"), array)
+
+        # the version is written last and marks complete columns
+        with open(osp.join(dir_columns, "version"), "w") as f:
+            f.write(str(self.version))
+
+    @staticmethod
+    def _get_postings(cids, rows, num_cids):
+        """
+        Groups rows by class ID, dropping duplicates, so that the rows of each class are sorted
+        """
+        num_rows = int(rows.max()) + 1 if len(rows) > 0 else 1
+        pairs = np.unique(cids.astype(np.int64) * num_rows + rows)
+        cids, rows = pairs // num_rows, pairs % num_rows
+        offsets = np.zeros(num_cids + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cids, minlength=num_cids), out=offsets[1:])
+        return offsets, rows
+
+
+def _map_npy(f):
+    """
+    Memory-maps a .npy file from an open file object, unlike ``np.load``, which maps by path
+    """
+    if np.lib.format.read_magic(f) == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if int(np.prod(shape)) == 0:
+        return np.empty(shape, dtype)
+    order = "F" if fortran_order else "C"
+    return np.memmap(f, dtype, "r", offset=f.tell(), shape=shape, order=order)
+
+
+class ColumnStore:
+    """
+    Read-only view of the columns saved by ``ColumnWriter``. Columns are memory-mapped on
+    first access, and annotation objects are assembled from array slices on demand.
+    """
+
+    def __init__(self, dir_columns, taxonomy):
+        # columns saved by an older API are treated as missing
+        path_version = osp.join(dir_columns, "version")
+        if not osp.isfile(path_version):
+            raise FileNotFoundError(path_version)
+        with open(path_version, "r") as f:
+            if f.read() != str(ColumnWriter.version):
+                raise FileNotFoundError(path_version)
+
+        self.dir_columns = dir_columns
+        self.taxonomy = taxonomy
+        self._columns = {}
+        self._stamps = {}  # name -> (device, inode) of the file first mapped
+
+    def open(self):
+        """
+        Memory-maps all columns. Columns are then read from these files even if the cache is
+        replaced by a later compile, since mapped files outlive their removal.
+        """
+        for fname in sorted(os.listdir(self.dir_columns)):
+            if fname.endswith(".npy"):
+                self[fname[: -len(".npy")]]
+        return self
+
+    def __getitem__(self, name):
+        if name not in self._columns:
+            path = osp.join(self.dir_columns, f"{name}.npy")
+            with open(path, "rb") as f:
+                stat = os.fstat(f.fileno())
+                stamp = (stat.st_dev, stat.st_ino)
+                # a column remapped after unpickling must belong to the same compile
+                if self._stamps.setdefault(name, stamp) != stamp:
+                    raise RuntimeError(f"{path} was replaced by a later compile")
+                self._columns[name] = _map_npy(f)
+        return self._columns[name]
+
+    def __getstate__(self):
+        # memory maps are re-opened lazily after unpickling, then checked against stamps
+        state = self.__dict__.copy()
+        state["_columns"] = {}
+        return state
+
+    def get_ids(self, kind):
+        return self[f"{kind}_keys"].tolist()
+
+    def get_row(self, kind, key):
+        keys = self[f"{kind}_keys"]
+        index = np.searchsorted(keys, key)
+        if index == len(keys) or keys[index] != key:
+            raise KeyError(key)
+        return int(self[f"{kind}_rows"][index])
+
+    def get_rows(self, kind, keys):
+        """
+        Vectorized ``get_row``
+        """
+        keys_sorted = self[f"{kind}_keys"]
+        keys = np.asarray(keys, dtype=keys_sorted.dtype if len(keys) == 0 else None)
+        indices = np.searchsorted(keys_sorted, keys)
+        is_missing = indices == len(keys_sorted)
+        is_missing[~is_missing] = keys_sorted[indices[~is_missing]] != keys[~is_missing]
+        if is_missing.any():
+            raise KeyError(keys[is_missing][0].item())
+        return np.asarray(self[f"{kind}_rows"][indices])
+
+    def get_rows_by_cids(self, kind, cids):
+        """
+        Returns the sorted rows of the instances annotated with any of the given classes.
+        For actor, object, attribute and relationship classes, these are rows of
+        higher-order interactions.
+        """
+        offsets = self[f"index_{kind}_offsets"]
+        rows = self[f"index_{kind}_rows"]
+        postings = [rows[offsets[cid] : offsets[cid + 1]] for cid in cids]
+        if len(postings) == 0:
+            return np.zeros(0, dtype=np.int64)
+        elif len(postings) == 1:
+            return np.array(postings[0])
+        return np.unique(np.concatenate(postings))
+
+    def _get_ann_hoi_raw(self, row):
+        start, end = self["hoi_entity_offsets"][row : row + 2]
+        ann_hoi_raw = {
+            "id": str(self["hoi_id"][row]),
+            "time": self["hoi_time"][row].item(),
+            "actors": [],
+            "objects": [],
+        }
+        for id_entity, kind, cid, bbox in zip(
+            self["entity_id"][start:end].tolist(),
+            self["entity_kind"][start:end].tolist(),
+            self["entity_cid"][start:end].tolist(),
+            self["entity_bbox"][start:end].tolist(),
+        ):
+            kind_entity = kinds_entity[kind]
+            ann_hoi_raw[f"{kind_entity}s"].append(
+                {
+                    "id": id_entity,
+                    "class_name": self.taxonomy[kind_entity][cid],
+                    "bbox": bbox,
+                }
+            )
+
+        start, end = self["hoi_att_offsets"][row : row + 2]
+        ann_hoi_raw["attributes"] = [
+            {"class_name": self.taxonomy["att"][cid][0], "source_id": id_src}
+            for id_src, cid in zip(
+                self["att_src"][start:end].tolist(), self["att_cid"][start:end].tolist()
+            )
+        ]
+
+        start, end = self["hoi_rel_offsets"][row : row + 2]
+        ann_hoi_raw["relationships"] = [
+            {
+                "class_name": self.taxonomy["rel"][cid][0],
+                "source_id": id_src,
+                "target_id": id_trg,
+            }
+            for id_src, id_trg, cid in zip(
+                self["rel_src"][start:end].tolist(),
+                self["rel_trg"][start:end].tolist(),
+                self["rel_cid"][start:end].tolist(),
+            )
+        ]
+
+        return ann_hoi_raw
+
+    def get_ann_sact(self, row):
+        start, end = self["sact_hoi_offsets"][row : row + 2]
+        ann_sact_raw = {
+            "id": str(self["sact_id"][row]),
+            "class_name": self.taxonomy["sact"][self["sact_cid"][row]],
+            "start_time": self["sact_start"][row].item(),
+            "end_time": self["sact_end"][row].item(),
+            "higher_order_interactions": [
+                self._get_ann_hoi_raw(row_hoi) for row_hoi in range(start, end)
+            ],
+        }
+        scale_factor = self["act_scale_factor"][self["sact_act"][row]].item()
+        return SAct(
+            ann_sact_raw,
+            scale_factor,
+            self.taxonomy["sact"],
+            self.taxonomy["actor"],
+            self.taxonomy["object"],
+            self.taxonomy["att"],
+            self.taxonomy["rel"],
+        )
+
+    def get_ann_hoi(self, row):
+        return HOI(
+            self._get_ann_hoi_raw(row),
+            self.taxonomy["actor"],
+            self.taxonomy["object"],
+            self.taxonomy["att"],
+            self.taxonomy["rel"],
+        )
+
+    def get_clip(self, row):
+        row_hoi = self["clip_hoi"][row]
+        start, end = self["clip_neighbor_offsets"][row : row + 2]
+        neighbors = [
+            [fname, time]
+            for fname, time in zip(
+                self["clip_neighbor_fname"][start:end].tolist(),
+                self["clip_neighbor_time"][start:end].tolist(),
+            )
+        ]
+        ann_hoi_raw = {
+            "id": str(self["hoi_id"][row_hoi]),
+            "time": self["hoi_time"][row_hoi].item(),
+        }
+        return Clip(ann_hoi_raw, neighbors)
+
+
+class ColumnDict(dict):
+    """
+    A read-only dictionary that maps instance IDs to annotations assembled from a ``ColumnStore``
+    """
+
+    def __init__(self, store, kind):
+        super().__init__()
+        assert kind in ["sact", "hoi", "clip"]
+        self.store = store
+        self.kind = kind
+        self._get = {
+            "sact": store.get_ann_sact,
+            "hoi": store.get_ann_hoi,
+            "clip": store.get_clip,
+        }[kind]
+
+    def keys(self):
+        return self.store.get_ids(self.kind)
+
+    def values(self):
+        return [self._get(row) for row in self.store[f"{self.kind}_rows"].tolist()]
+
+    def items(self):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        return self._get(self.store.get_row(self.kind, key))
+
+    def __contains__(self, key):
+        try:
+            self.store.get_row(self.kind, key)
+        except KeyError:
+            return False
+        return True
+
+    def __len__(self):
+        return len(self.store[f"{self.kind}_keys"])
+
+    def __repr__(self):
+        return "ColumnDict()"
+
+    def __reduce__(self):
+        return self.__class__, (self.store, self.kind)
@@ -1,6 +1,9 @@
+import collections
 import glob
+import os
 import os.path as osp
 import pickle
+import struct
 
 
 class Bidict(dict):
@@ -27,6 +30,9 @@ class Bidict(dict):
             del self.inverse[self[key]]
         super(Bidict, self).__delitem__(key)
 
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
 
 class OrderedBidict(dict):
     """
@@ -47,17 +53,202 @@ class OrderedBidict(dict):
     def __delitem__(self, key):
         raise NotImplementedError
 
+    def __reduce__(self):
+        return self.__class__, (dict(self),)
+
+
+class Buffer:
+    """
+    A buffer of loaded records that is bounded by a number of entries and/or a number of bytes.
+    Once a bound is exceeded, records are evicted following either the least recently used
+    (``'lru'``) or the CLOCK (``'clock'``, second chance) policy. Hit, miss and eviction
+    counters are reported by ``stats``.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, policy="lru"):
+        assert policy in ["lru", "clock"]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.records = collections.OrderedDict()  # key -> [value, size, referenced]
+        self.num_bytes = 0
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_evictions = 0
+
+    @property
+    def stats(self):
+        return {
+            "hits": self.num_hits,
+            "misses": self.num_misses,
+            "evictions": self.num_evictions,
+            "entries": len(self.records),
+            "bytes": self.num_bytes,
+        }
+
+    def get(self, key):
+        record = self.records.get(key)
+        if record is None:
+            self.num_misses += 1
+            return None
+
+        self.num_hits += 1
+        if self.policy == "lru":
+            self.records.move_to_end(key)
+        else:
+            record[2] = True
+        return record[0]
+
+    def put(self, key, value, size=0):
+        if key in self.records:
+            self.num_bytes -= self.records.pop(key)[1]
+        self.records[key] = [value, size, True]
+        self.num_bytes += size
+
+        # the most recent record is kept even if it alone exceeds the bounds
+        while len(self.records) > 1 and self._is_full():
+            key_oldest, record_oldest = next(iter(self.records.items()))
+            if self.policy == "clock" and record_oldest[2]:
+                record_oldest[2] = False
+                self.records.move_to_end(key_oldest)
+            else:
+                del self.records[key_oldest]
+                self.num_bytes -= record_oldest[1]
+                self.num_evictions += 1
+
+    def _is_full(self):
+        return (
+            self.max_entries is not None and len(self.records) > self.max_entries
+        ) or (self.max_bytes is not None and self.num_bytes > self.max_bytes)
+
+    def clear(self):
+        self.records.clear()
+        self.num_bytes = 0
+
+    def __contains__(self, key):
+        return key in self.records
+
+    def __len__(self):
+        return len(self.records)
+
+    def __repr__(self):
+        return f"Buffer(policy={self.policy}, stats={self.stats})"
+
+
+class DictView(dict):
+    """
+    A dictionary that reads from the dictionary returned by ``_get_data()`` in subclasses. Only
+    keys are listed, since values can be large.
+    """
+
+    def _get_data(self):
+        raise NotImplementedError
+
+    def keys(self):
+        return self._get_data().keys()
+
+    def values(self):
+        raise NotImplementedError
+
+    def items(self):
+        raise NotImplementedError
+
+    def __getitem__(self, key):
+        return self._get_data()[key]
+
+    def __len__(self):
+        return len(self._get_data().keys())
+
+    def __repr__(self):
+        return repr(self._get_data())
+
 
 class LazyDict(dict):
-    def __init__(self, dir_cache, prefix):
+    """
+    A read-only dictionary whose values are pickled records packed into a few shard files.
+    Each shard ends with a key -> (offset, length) index followed by the 8-byte offset of that
+    index, so that a record is loaded with a single positional read.
+
+    The keys and record locations of all shards are also returned by ``LazyDictWriter`` as a manifest.
+    Passing it back to the constructor avoids listing the cache directory and reading the
+    per-shard indices.
+
+    Loaded records are kept in a ``Buffer``, which can be bounded and shared across several
+    dictionaries. The size of a record is taken to be the length of its pickle.
+    """
+
+    def __init__(self, dir_cache, prefix, manifest=None, buffer=None):
         super().__init__()
-        self.buffer = {}
+        self.buffer = Buffer() if buffer is None else buffer
         self.dir_cache = dir_cache
         self.path_prefix = osp.join(dir_cache, f"{prefix}_")
-        self._keys = [
-            self.removeprefix(x, self.path_prefix)
-            for x in glob.glob(self.path_prefix + "*")
-        ]
+        if manifest is None:
+            manifest = self._read_manifest(self.path_prefix)
+
+        self.paths = [osp.join(dir_cache, fname) for fname in manifest["fnames"]]
+        self.index = manifest["index"]
+        self._keys = list(self.index.keys())
+        self._fds = {}
+        self._stamps = {}  # shard -> (device, inode) of the file first opened
+
+    @staticmethod
+    def _read_manifest(path_prefix):
+        paths = sorted(glob.glob(path_prefix + "*.pack"))
+        if len(paths) == 0:
+            raise FileNotFoundError(path_prefix + "*.pack")
+
+        index = {}
+        for shard, path in enumerate(paths):
+            with open(path, "rb") as f:
+                f.seek(-8, os.SEEK_END)
+                (offset_index,) = struct.unpack("<Q", f.read(8))
+                f.seek(offset_index)
+                index_shard = pickle.load(f)
+            for key, (offset, length) in index_shard.items():
+                index[key] = (shard, offset, length)
+
+        return {"fnames": [osp.basename(path) for path in paths], "index": index}
+
+    def open(self):
+        """
+        Opens all shard files. Records are then read from these files even if the cache is
+        replaced by a later compile, since open files outlive their removal.
+        """
+        for shard in range(len(self.paths)):
+            if shard not in self._fds:
+                self._open_shard(shard)
+        return self
+
+    def close(self):
+        """
+        Closes all shard files. Shards are opened again if a record is read afterwards.
+        """
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    def _open_shard(self, shard):
+        fd = os.open(self.paths[shard], os.O_RDONLY)
+        stat = os.fstat(fd)
+        stamp = (stat.st_dev, stat.st_ino)
+        # a shard reopened after unpickling must be the file that the index refers to
+        if self._stamps.setdefault(shard, stamp) != stamp:
+            os.close(fd)
+            raise RuntimeError(f"{self.paths[shard]} was replaced by a later compile")
+        self._fds[shard] = fd
+
+    def get_raw(self, key):
+        """
+        Returns the pickled record of a key without unpickling it
+        """
+        shard, offset, length = self.index[key]
+        if shard not in self._fds:
+            self._open_shard(shard)
+        if hasattr(os, "pread"):
+            return os.pread(self._fds[shard], length, offset)
+        else:  # Windows
+            os.lseek(self._fds[shard], offset, os.SEEK_SET)
+            return os.read(self._fds[shard], length)
 
     def keys(self):
         return self._keys
@@ -69,13 +260,15 @@ class LazyDict(dict):
         raise NotImplementedError
 
     def __getitem__(self, key):
-        if key in self.buffer:
-            return self.buffer[key]
-        else:
-            with open(self.path_prefix + key, "rb") as f:
-                value = pickle.load(f)
-                self.buffer[key] = value
-                return value
+        value = self.buffer.get((self.path_prefix, key))
+        if value is None:
+            data = self.get_raw(key)
+            value = pickle.loads(data)
+            self.buffer.put((self.path_prefix, key), value, len(data))
+        return value
+
+    def __contains__(self, key):
+        return key in self.index
 
     def __len__(self):
         return len(self._keys)
@@ -83,8 +276,75 @@ class LazyDict(dict):
     def __repr__(self):
         return "LazyDict()"
 
-    # Added for python backwards compatibility
-    def removeprefix(self, text, prefix):
-        if text.startswith(prefix):
-            return text[len(prefix) :]
-        return text
+    def __reduce__(self):
+        # file descriptors are not shared across processes
+        state = self.__dict__.copy()
+        state["_fds"] = {}
+        return self.__class__.__new__, (self.__class__,), state
+
+    def __del__(self):
+        if hasattr(self, "_fds"):
+            self.close()
+
+
+class LazyDictWriter:
+    """
+    Packs pickled records into the shard files read by ``LazyDict``. Records are written in the
+    order they are added, and a new shard is only started between groups so that records of
+    the same group stay adjacent.
+
+    :param size_shard: the approximate maximum size of a shard in bytes
+    """
+
+    def __init__(self, dir_cache, prefix, size_shard=2**28):
+        os.makedirs(dir_cache, exist_ok=True)
+        self.path_prefix = osp.join(dir_cache, f"{prefix}_")
+        self.size_shard = size_shard
+        self.manifest = {"fnames": [], "index": {}}
+        self._f = None
+        self._index = None
+        self._group_last = None
+
+    def add(self, group, key, data):
+        """
+        :param group: records of the same group are kept in the same shard
+        :param data: the pickled value
+        """
+        if self._f is None or (
+            group != self._group_last and self._f.tell() >= self.size_shard
+        ):
+            self._open_shard()
+        offset = self._f.tell()
+        self._index[key] = (offset, len(data))
+        self.manifest["index"][key] = (
+            len(self.manifest["fnames"]) - 1,
+            offset,
+            len(data),
+        )
+        self._f.write(data)
+        self._group_last = group
+
+    def close(self):
+        """
+        :return: a manifest of the shard files and the key -> (shard, offset, length) index
+        """
+        # always write a shard so that an empty dictionary is distinguishable from a
+        # missing one
+        if self._f is None:
+            self._open_shard()
+        self._close_shard()
+        return self.manifest
+
+    def _open_shard(self):
+        if self._f is not None:
+            self._close_shard()
+        path = f"{self.path_prefix}{len(self.manifest['fnames']):03d}.pack"
+        self.manifest["fnames"].append(osp.basename(path))
+        self._f, self._index = open(path, "wb"), {}
+
+    def _close_shard(self):
+        offset_index = self._f.tell()
+        pickle.dump(self._index, self._f)
+        self._f.write(struct.pack("<Q", offset_index))
+        self._f.close()
+        self._f = None
@@ -0,0 +1,90 @@
+import os
+import os.path as osp
+
+import numpy as np
+
+
+class FileManifest:
+    """
+    An in-memory manifest of the names and sizes of the files in each directory of ``videos/``.
+    A directory is listed once, on the first check of one of its files, so that checks do not
+    query the file system for every path. Listing a directory reads only the names of its
+    files, and the size of a file is only read the first time that it is requested. Call
+    ``refresh()`` after files are added, removed or changed.
+    """
+
+    def __init__(self, dir_videos):
+        self.dir_videos = dir_videos
+        self.fnames = {}  # dirname -> sorted file names
+        self.sizes = {}  # dirname -> sizes in bytes, or -1 if not read yet
+
+    def refresh(self, dirname=None):
+        """
+        Lists a directory of ``videos/`` again, or all directories listed so far if ``dirname``
+        is ``None``
+        """
+        dirnames = list(self.fnames.keys()) if dirname is None else [dirname]
+        for dirname in dirnames:
+            fnames = []
+            path = osp.join(self.dir_videos, dirname)
+            if osp.isdir(path):
+                # the entry type is read along with the name on most file systems
+                with os.scandir(path) as entries:
+                    fnames = [entry.name for entry in entries if entry.is_file()]
+
+            self.fnames[dirname] = np.sort(np.array(fnames, dtype=str))
+            self.sizes[dirname] = np.full(len(fnames), -1, dtype=np.int64)
+
+    def _lookup(self, paths):
+        """
+        :return: the index of each path in the manifest of its directory, or -1 if missing
+        """
+        dirnames = np.array(
+            [osp.basename(osp.dirname(path)) for path in paths], dtype=str
+        )
+        fnames = np.array([osp.basename(path) for path in paths], dtype=str)
+
+        indices = np.full(len(paths), -1, dtype=np.int64)
+        for dirname in np.unique(dirnames):
+            if dirname not in self.fnames:
+                self.refresh(dirname)
+            is_dirname = dirnames == dirname
+            fnames_all = self.fnames[dirname]
+            if len(fnames_all) == 0:
+                continue
+
+            indices_dirname = np.searchsorted(fnames_all, fnames[is_dirname])
+            indices_dirname = np.minimum(indices_dirname, len(fnames_all) - 1)
+            is_found = fnames_all[indices_dirname] == fnames[is_dirname]
+            indices[is_dirname] = np.where(is_found, indices_dirname, -1)
+
+        return dirnames, indices
+
+    def exists(self, paths):
+        """
+        :param paths: paths to files in the directories of ``videos/``
+        :return: a boolean NumPy array that indicates whether each file exists
+        """
+        _, indices = self._lookup(paths)
+        return indices >= 0
+
+    def get_sizes(self, paths):
+        """
+        :param paths: paths to files in the directories of ``videos/``
+        :return: a NumPy array of file sizes in bytes, or -1 for missing files
+        """
+        dirnames, indices = self._lookup(paths)
+        sizes = np.full(len(paths), -1, dtype=np.int64)
+        for dirname in np.unique(dirnames[indices >= 0]):
+            is_dirname = (dirnames == dirname) & (indices >= 0)
+            sizes_dirname = self.sizes[dirname]
+            for index in np.unique(indices[is_dirname]):
+                if sizes_dirname[index] < 0:
+                    fname = self.fnames[dirname][index]
+                    path = osp.join(self.dir_videos, dirname, fname)
+                    try:
+                        sizes_dirname[index] = os.stat(path).st_size
+                    except FileNotFoundError:  # removed since the directory was listed
+                        pass
+            sizes[is_dirname] = sizes_dirname[indices[is_dirname]]
+        return sizes
@@ -1,20 +1,47 @@
-import itertools
+import collections
+import contextlib
+import glob
+import hashlib
 import json
+import multiprocessing
+import multiprocessing.pool
 import os
 import os.path as osp
 import pickle
 import shutil
-
-from .data import Bidict, LazyDict, Metadatum, Act, SAct, HOI, Clip
+import tempfile
+
+import numpy as np
+
+from .utils import get_fingerprint, iter_json_array, lock_file
+from .version import __version__
+from .data import (
+    Buffer,
+    LazyDict,
+    LazyDictWriter,
+    ColumnWriter,
+    ColumnStore,
+    ColumnDict,
+    get_children,
+    Metadatum,
+    Act,
+    SAct,
+    HOI,
+    Clip,
+)
 
 """
 The following functions are publicly available:
  - retrieve()
  - map_id()
+ - map_ids()
+ - intern() and extern()
+ - get_subset()
  - map_cid()
+ - find_ids()
 
 retrieve(): accesses the value given a key
- - split -> ids_act (one-to-many): retrieve(kind='id_act', key=split)
+ - split -> ids_act, ids_sact, ids_hoi (one-to-many): retrieve(kind='ids_act', 'ids_sact' or 'ids_hoi', key=split)
  - id_act -> ann_act, metadatum (one-to-one): retrieve(kind='ann_act' or 'metadatum', key=id_act)
  - id_sact -> ann_sact (one-to-one): retrieve(kind='ann_sact', key=id_sact)
  - id_hoi -> ann_hoi, clip (one-to-one): retrieve(kind='ann_hoi' or 'clip', key=id_hoi)
@@ -26,20 +53,72 @@ map_id(): maps instance IDs across the MOMA hierarchy
  - id_sact -> ids_hoi (one-to-many): map_id(id_sact=id_sact, kind='hoi')
  - id_hoi -> id_sact (one-to-one): map_id(id_hoi=id_hoi, kind='sact')
  - id_hoi -> id_act (one-to-one): map_id(id_hoi=id_hoi, kind='act')
- 
+
+map_ids(): maps many instance IDs across the MOMA hierarchy in one vectorized call
+ - ids_act -> ids_sact, ids_hoi: map_ids(kind='sact' or 'hoi', ids_act=ids_act)
+ - ids_sact -> ids_act, ids_hoi: map_ids(kind='act' or 'hoi', ids_sact=ids_sact)
+ - ids_hoi -> ids_act, ids_sact: map_ids(kind='act' or 'sact', ids_hoi=ids_hoi)
+ - children in temporal order: map_ids(..., ordered=True)
+
+get_subset(): closes a subset of instances over the MOMA hierarchy as sorted dense IDs
+ - ids_act, ids_sact or ids_hoi -> rows_act, rows_sact, rows_hoi: get_subset(ids_sact=ids_sact)
+
+intern() and extern(): translate between string instance IDs and dense integer instance IDs
+ - ids -> dense IDs: intern(kind='act', 'sact' or 'hoi', ids=ids)
+ - dense IDs -> ids: extern(kind='act', 'sact' or 'hoi', ids=dense_ids)
+
 map_cid(): maps activity and sub-activity class IDs between few-shot and standard paradigms
  - cid_fs -> cid_std: map_cid(split=split, cid_act=cid_fs or cid_sact=cid_fs)
  - cid_std -> cid_fs: map_cid(split=split, cid_act=cid_std or cid_sact=cid_std)
+
+find_ids(): finds instance IDs by class name with the inverted indexes of the cache
+ - cnames_act -> ids_act: find_ids(kind='act', cnames=cnames_act)
+ - cnames_sact -> ids_sact: find_ids(kind='sact', cnames=cnames_sact)
+ - cnames_actor, cnames_object, cnames_att, cnames_rel -> ids_hoi: find_ids(kind='actor', ...)
+
+locate_sacts() and locate_hois(): search the temporal indexes of an activity
+ - id_act, times -> dense IDs of the covering sub-activities: locate_sacts(id_act, times)
+ - id_act, [start, end) -> dense IDs of the higher-order interactions: locate_hois(id_act, start, end)
 """
 
 
+_taxonomy_worker = None
+
+
+def _init_worker(taxonomy):
+    global _taxonomy_worker
+    _taxonomy_worker = taxonomy
+
+
+def _compile_act(args):
+    return Lookup._compile_act(_taxonomy_worker, *args)
+
+
 class Lookup:
     """
     Lookup utility class to help lookup annotations.
+
+    Sub-activity, higher-order interaction and clip annotations are served by one of two backends:
+
+        * ``'pickle'``: one pickled object per instance, unpickled on first access
+        * ``'columnar'``: flat, memory-mapped NumPy columns from which objects are assembled on access
+
+    Objects unpickled by the ``'pickle'`` backend are kept in ``buffer``, a ``Buffer`` shared by
+    all lazy dictionaries whose ``stats`` report hits, misses and evictions.
     """
 
-    def __init__(self, dir_moma, taxonomy, reset_cache):
+    def __init__(
+        self, dir_moma, taxonomy, reset_cache, backend="pickle", buffer=None, jobs=1
+    ):
+        assert backend in ["pickle", "columnar"]
         self.taxonomy = taxonomy
+        self.backend = backend
+        self.jobs = jobs
+        self.buffer = Buffer() if buffer is None else buffer
+        self.dir_lookup = osp.join(dir_moma, "anns/cache/lookup")
+        self.fingerprint = get_fingerprint(dir_moma)
+        self._digest_taxonomy = None
+        self._digests = None
 
         names = [
             "id_act_to_metadatum",
@@ -47,61 +126,234 @@ class Lookup:
             "id_sact_to_ann_sact",
             "id_hoi_to_ann_hoi",
             "id_hoi_to_clip",
-            "id_sact_to_id_act",
-            "id_hoi_to_id_sact",
         ]
         names_lazy = ["id_sact_to_ann_sact", "id_hoi_to_ann_hoi", "id_hoi_to_clip"]
-        names_bidict = ["id_sact_to_id_act", "id_hoi_to_id_sact"]
-        self._read_anns(dir_moma, reset_cache, names, names_lazy, names_bidict)
         self.paradigm_and_split_to_ids_act = self._read_paradigms_and_splits(dir_moma)
+        self._read_anns(dir_moma, reset_cache, names, names_lazy)
 
     @staticmethod
-    def _save_cache(dir_moma, data, names, names_lazy):
-        dir_lookup = osp.join(dir_moma, "anns/cache/lookup")
-        os.makedirs(dir_lookup, exist_ok=True)
-
+    def _save_cache(dir_cache, names, columns, splits, manifest, digests, fingerprint):
+        # the records of activities were appended one by one, and are loaded one dictionary
+        # at a time
         for name in names:
-            if name in names_lazy:
-                src, trg = name.split("_to_")
-                os.makedirs(osp.join(dir_lookup, src), exist_ok=True)
-                for key, value in data[name].items():
-                    with open(
-                        osp.join(dir_lookup, f'{name.replace("_to_", "/")}_{key}'), "wb"
-                    ) as f:
-                        pickle.dump(value, f)
-            else:
-                with open(osp.join(dir_lookup, name), "wb") as f:
-                    pickle.dump(data[name], f)
+            path_chunks = osp.join(dir_cache, f"{name}.chunks")
+            with open(osp.join(dir_cache, name), "wb") as f:
+                pickle.dump(Lookup._load_chunks(path_chunks), f)
+            os.remove(path_chunks)
+
+        columns.save(osp.join(dir_cache, "columns"), splits)
+
+        # keys and record locations of the lazy dictionaries, loaded in a single read
+        with open(osp.join(dir_cache, "manifest"), "wb") as f:
+            pickle.dump(manifest, f)
+
+        # per-activity digests for incremental compiles
+        with open(osp.join(dir_cache, "id_act_to_digest"), "wb") as f:
+            pickle.dump(digests, f)
+
+        # the fingerprint of the sources is written last and marks a complete cache
+        with open(osp.join(dir_cache, "fingerprint"), "w") as f:
+            f.write(fingerprint)
 
     @staticmethod
-    def _load_cache(dir_moma, names, names_lazy):
+    def _load_chunks(path_chunks):
+        """
+        Merges the dictionaries pickled one after another into a file
+        """
+        value = {}
+        with open(path_chunks, "rb") as f:
+            while True:
+                try:
+                    value.update(pickle.load(f))
+                except EOFError:
+                    return value
+
+    @staticmethod
+    def _read_fingerprint(dir_lookup):
+        path_fingerprint = osp.join(dir_lookup, "fingerprint")
+        if not osp.exists(path_fingerprint):
+            return None
+        with open(path_fingerprint, "r") as f:
+            return f.read()
+
+    def _load_cache(self, dir_moma, names, names_lazy):
+        """
+        Loads the cache. The caller holds the lock of the cache, and all shard files are opened
+        and all columns are memory-mapped here, so that a later compile, which replaces the
+        cache directory, cannot change the files read by this instance.
+        """
         dir_lookup = osp.join(dir_moma, "anns/cache/lookup")
 
         data = {}
+        # the columns hold the inverted indexes for either backend
+        dir_columns = osp.join(dir_lookup, "columns")
+        self.columns = ColumnStore(dir_columns, self.taxonomy).open()
+        if self.backend == "pickle":
+            with open(osp.join(dir_lookup, "manifest"), "rb") as f:
+                manifest = pickle.load(f)
         for name in names:
-            if name in names_lazy:
+            if name in names_lazy and self.backend == "columnar":
+                kind = name.split("_to_")[1].replace("ann_", "")
+                data[name] = ColumnDict(self.columns, kind)
+            elif name in names_lazy:
                 src, trg = name.split("_to_")
-                data[name] = LazyDict(osp.join(dir_lookup, src), trg)
+                data[name] = LazyDict(
+                    osp.join(dir_lookup, src), trg, manifest[name], self.buffer
+                ).open()
             else:
                 with open(osp.join(dir_lookup, name), "rb") as f:
                     data[name] = pickle.load(f)
+        with open(osp.join(dir_lookup, "id_act_to_digest"), "rb") as f:
+            self._digests = pickle.load(f)
 
         return data
 
-    def _read_anns(self, dir_moma, reset_cache, names, names_lazy, names_bidict):
+    def _try_load_cache(self, dir_moma, names, names_lazy):
+        """
+        Loads the cache, or returns None if it is missing, incomplete or stale
+        """
         dir_lookup = osp.join(dir_moma, "anns/cache/lookup")
-        if reset_cache and osp.exists(dir_lookup):
-            shutil.rmtree(dir_lookup)
+        if self._read_fingerprint(dir_lookup) != self.fingerprint:
+            return None
+        try:
+            return self._load_cache(dir_moma, names, names_lazy)
+        except FileNotFoundError:  # cache compiled by an older API
+            return None
+
+    @staticmethod
+    def _load_records(dir_lookup, names_lazy):
+        """
+        Loads the per-activity digests and the raw records of a previous, complete cache
+        """
+        if Lookup._read_fingerprint(dir_lookup) is None:
+            return {}, None
 
         try:
-            data = self._load_cache(dir_moma, names, names_lazy)
+            with open(osp.join(dir_lookup, "id_act_to_digest"), "rb") as f:
+                digests = pickle.load(f)
+            with open(osp.join(dir_lookup, "manifest"), "rb") as f:
+                manifest = pickle.load(f)
+        except FileNotFoundError:  # cache compiled by an older API
+            return {}, None
 
-        except FileNotFoundError:
-            print("Compiling the Lookup class...")
+        records = {}
+        for name in names_lazy:
+            src, trg = name.split("_to_")
+            records[name] = LazyDict(osp.join(dir_lookup, src), trg, manifest[name])
 
-            with open(osp.join(dir_moma, f"anns/anns.json"), "r") as f:
-                anns_raw = json.load(f)
+        return digests, records
+
+    def get_digests(self):
+        """
+        Returns the digests of the annotations of each activity as of the loaded cache
+        """
+        return dict(self._digests)
+
+    def _get_digest(self, ann_raw, clips):
+        # a change in the taxonomy or in the API changes class IDs, so it invalidates
+        # all records
+        if self._digest_taxonomy is None:
+            kinds = ["act", "sact", "actor", "object", "att", "rel"]
+            self._digest_taxonomy = hashlib.sha1(
+                json.dumps(
+                    [__version__] + [self.taxonomy[kind] for kind in kinds]
+                ).encode()
+            ).hexdigest()
+
+        digest = hashlib.sha1(self._digest_taxonomy.encode())
+        digest.update(json.dumps([ann_raw, clips], sort_keys=True).encode())
+        return digest.hexdigest()
 
+    @staticmethod
+    def _compile_act(taxonomy, ann_raw, clips, records_old=None):
+        """
+        Builds the records of an activity. The pickled sub-activity, higher-order interaction
+        and clip records are copied from ``records_old`` if given. Records also include the
+        parent of each sub-activity and higher-order interaction.
+        """
+        records = {
+            "id_act_to_metadatum": {},
+            "id_act_to_ann_act": {},
+            "id_sact_to_ann_sact": {},
+            "id_hoi_to_ann_hoi": {},
+            "id_hoi_to_clip": {},
+            "id_sact_to_id_act": {},
+            "id_hoi_to_id_sact": {},
+        }
+
+        ann_act_raw = ann_raw["activity"]
+        metadatum = Metadatum(ann_raw)
+        records["id_act_to_metadatum"][ann_act_raw["id"]] = metadatum
+        records["id_act_to_ann_act"][ann_act_raw["id"]] = Act(
+            ann_act_raw, taxonomy["act"]
+        )
+        anns_sact_raw = ann_act_raw["sub_activities"]
+
+        for ann_sact_raw in anns_sact_raw:
+            if records_old is not None:
+                records["id_sact_to_ann_sact"][ann_sact_raw["id"]] = records_old[
+                    "id_sact_to_ann_sact"
+                ].get_raw(ann_sact_raw["id"])
+            else:
+                records["id_sact_to_ann_sact"][ann_sact_raw["id"]] = pickle.dumps(
+                    SAct(
+                        ann_sact_raw,
+                        metadatum.scale_factor,
+                        taxonomy["sact"],
+                        taxonomy["actor"],
+                        taxonomy["object"],
+                        taxonomy["att"],
+                        taxonomy["rel"],
+                    )
+                )
+            records["id_sact_to_id_act"][ann_sact_raw["id"]] = ann_act_raw["id"]
+            anns_hoi_raw = ann_sact_raw["higher_order_interactions"]
+
+            for ann_hoi_raw in anns_hoi_raw:
+                if records_old is not None:
+                    records["id_hoi_to_ann_hoi"][ann_hoi_raw["id"]] = records_old[
+                        "id_hoi_to_ann_hoi"
+                    ].get_raw(ann_hoi_raw["id"])
+                else:
+                    records["id_hoi_to_ann_hoi"][ann_hoi_raw["id"]] = pickle.dumps(
+                        HOI(
+                            ann_hoi_raw,
+                            taxonomy["actor"],
+                            taxonomy["object"],
+                            taxonomy["att"],
+                            taxonomy["rel"],
+                        )
+                    )
+                # Currently, only clips from the test set have been generated
+                if ann_hoi_raw["id"] in clips and records_old is not None:
+                    records["id_hoi_to_clip"][ann_hoi_raw["id"]] = records_old[
+                        "id_hoi_to_clip"
+                    ].get_raw(ann_hoi_raw["id"])
+                elif ann_hoi_raw["id"] in clips:
+                    records["id_hoi_to_clip"][ann_hoi_raw["id"]] = pickle.dumps(
+                        Clip(ann_hoi_raw, clips[ann_hoi_raw["id"]])
+                    )
+                records["id_hoi_to_id_sact"][ann_hoi_raw["id"]] = ann_sact_raw["id"]
+
+        return records
+
+    def _compile(self, dir_moma, names, names_lazy):
+        """
+        Compiles the cache while streaming anns.json. Records are written to disk as activities
+        are compiled, and columns are flushed in typed chunks, so that raw annotations and
+        objects are only held for the activities in flight. Memory still grows with the dataset
+        through the record index of the lazy dictionaries, and saving loads each non-lazy
+        dictionary and then the columns whole. Records are written to a temporary directory
+        that atomically replaces the previous cache once complete. The caller must hold the
+        compile lock.
+        """
+        dir_lookup = osp.join(dir_moma, "anns/cache/lookup")
+        dirs_tmp = glob.glob(f"{dir_lookup}.tmp-*") + glob.glob(f"{dir_lookup}.old-*")
+        for dir_tmp in dirs_tmp:
+            shutil.rmtree(dir_tmp)  # left behind by an interrupted compile
+        dir_tmp = tempfile.mkdtemp(prefix="lookup.tmp-", dir=osp.dirname(dir_lookup))
+
+        try:
             if osp.exists(osp.join(dir_moma, f"videos/interaction_frames")):
                 with open(
                     osp.join(dir_moma, f"videos/interaction_frames/timestamps.json"),
@@ -111,52 +363,143 @@ class Lookup:
             else:
                 info_clips = None
 
-            data = {name: {} for name in names}
-            for ann_raw in anns_raw:
-                ann_act_raw = ann_raw["activity"]
-                data["id_act_to_metadatum"][ann_act_raw["id"]] = Metadatum(ann_raw)
-                data["id_act_to_ann_act"][ann_act_raw["id"]] = Act(
-                    ann_act_raw, self.taxonomy["act"]
+            # activities whose annotations are unchanged since the last compile reuse
+            # its records
+            digests_old, records_old = self._load_records(dir_lookup, names_lazy)
+
+            # records are grouped by parent so that siblings are adjacent on disk
+            name_to_name_parent = {
+                "id_sact_to_ann_sact": "id_sact_to_id_act",
+                "id_hoi_to_ann_hoi": "id_hoi_to_id_sact",
+                "id_hoi_to_clip": "id_hoi_to_id_sact",
+            }
+            writers = {}
+            for name in names_lazy:
+                src, trg = name.split("_to_")
+                writers[name] = LazyDictWriter(osp.join(dir_tmp, src), trg)
+            names_data = [name for name in names if name not in names_lazy]
+            chunks = {
+                name: open(osp.join(dir_tmp, f"{name}.chunks"), "wb")
+                for name in names_data
+            }
+            columns = ColumnWriter(self.taxonomy, osp.join(dir_tmp, "columns.chunks"))
+            digests = {}
+
+            def write(ann_raw, records):
+                for name in names_lazy:
+                    parents = records[name_to_name_parent[name]]
+                    for key, value in records[name].items():
+                        writers[name].add(parents[key], key, value)
+                for name in names_data:
+                    pickle.dump(records[name], chunks[name])
+                id_act = ann_raw["activity"]["id"]
+                scale_factor = records["id_act_to_metadatum"][id_act].scale_factor
+                columns.add(ann_raw, scale_factor, info_clips)
+
+            # changed activities are built across a process pool; results are written in
+            # submission order, which keeps the cache deterministic, and the number of
+            # activities in flight is bounded
+            num_pending = self.jobs * 4 if self.jobs > 1 else 0
+            pending = collections.deque()
+
+            def flush(num_pending):
+                while len(pending) > num_pending:
+                    ann_raw, records = pending.popleft()
+                    if isinstance(records, multiprocessing.pool.AsyncResult):
+                        records = records.get()
+                    write(ann_raw, records)
+
+            if self.jobs > 1:
+                pool = multiprocessing.Pool(
+                    self.jobs, initializer=_init_worker, initargs=(self.taxonomy,)
+                )
+            else:
+                pool = contextlib.nullcontext()
+            with pool as pool:
+                for ann_raw in iter_json_array(osp.join(dir_moma, "anns/anns.json")):
+                    id_act = ann_raw["activity"]["id"]
+                    clips = {}
+                    if info_clips is not None:
+                        for ann_sact_raw in ann_raw["activity"]["sub_activities"]:
+                            anns_hoi_raw = ann_sact_raw["higher_order_interactions"]
+                            for id_hoi in [ann["id"] for ann in anns_hoi_raw]:
+                                if id_hoi in info_clips:
+                                    clips[id_hoi] = info_clips[id_hoi]
+
+                    digests[id_act] = self._get_digest(ann_raw, clips)
+                    if digests_old.get(id_act) == digests[id_act]:
+                        records = self._compile_act(
+                            self.taxonomy, ann_raw, clips, records_old
+                        )
+                    elif pool is not None:
+                        records = pool.apply_async(_compile_act, ((ann_raw, clips),))
+                    else:
+                        records = self._compile_act(self.taxonomy, ann_raw, clips)
+                    pending.append((ann_raw, records))
+                    flush(num_pending)
+
+                flush(0)
+
+            # clips are only looked up while streaming
+            info_clips = None
+
+            manifest = {name: writers[name].close() for name in names_lazy}
+            for f in chunks.values():
+                f.close()
+            self._save_cache(
+                dir_tmp,
+                names_data,
+                columns,
+                self.paradigm_and_split_to_ids_act,
+                manifest,
+                digests,
+                self.fingerprint,
+            )
+
+            # the previous records must not hold open files of the cache being removed
+            if records_old is not None:
+                for records in records_old.values():
+                    records.close()
+
+            # swap in the new cache with renames, which are atomic within a file system
+            if osp.exists(dir_lookup):
+                dir_old = tempfile.mkdtemp(
+                    prefix="lookup.old-", dir=osp.dirname(dir_lookup)
                 )
-                scale_factor = data["id_act_to_metadatum"][
-                    ann_act_raw["id"]
-                ].scale_factor
-                anns_sact_raw = ann_act_raw["sub_activities"]
+                os.rename(dir_lookup, osp.join(dir_old, "lookup"))
+                os.rename(dir_tmp, dir_lookup)
+                shutil.rmtree(dir_old)
+            else:
+                os.rename(dir_tmp, dir_lookup)
+        finally:
+            # an interrupted compile leaves the previous cache in place
+            if osp.exists(dir_tmp):
+                shutil.rmtree(dir_tmp)
 
-                for ann_sact_raw in anns_sact_raw:
-                    data["id_sact_to_ann_sact"][ann_sact_raw["id"]] = SAct(
-                        ann_sact_raw,
-                        scale_factor,
-                        self.taxonomy["sact"],
-                        self.taxonomy["actor"],
-                        self.taxonomy["object"],
-                        self.taxonomy["att"],
-                        self.taxonomy["rel"],
-                    )
-                    data["id_sact_to_id_act"][ann_sact_raw["id"]] = ann_act_raw["id"]
-                    anns_hoi_raw = ann_sact_raw["higher_order_interactions"]
+    def _read_anns(self, dir_moma, reset_cache, names, names_lazy):
+        dir_lookup = osp.join(dir_moma, "anns/cache/lookup")
+
+        data = None
+        if not reset_cache:
+            # a compile in another process only swaps the cache once no process is
+            # loading it
+            with lock_file(f"{dir_lookup}.lock", shared=True):
+                data = self._try_load_cache(dir_moma, names, names_lazy)
+        if data is None:
+            # exactly one process compiles, while the others wait and load its cache
+            with lock_file(f"{dir_lookup}.lock"):
+                if reset_cache and osp.exists(dir_lookup):
+                    shutil.rmtree(dir_lookup)
+                else:
+                    data = self._try_load_cache(dir_moma, names, names_lazy)
+
+                if data is None:
+                    print("Compiling the Lookup class...")
+                    self._compile(dir_moma, names, names_lazy)
+                    # serve the freshly compiled annotations from the cache so that they
+                    # are subject to the requested backend and buffer bounds
+                    data = self._load_cache(dir_moma, names, names_lazy)
 
-                    for ann_hoi_raw in anns_hoi_raw:
-                        data["id_hoi_to_ann_hoi"][ann_hoi_raw["id"]] = HOI(
-                            ann_hoi_raw,
-                            self.taxonomy["actor"],
-                            self.taxonomy["object"],
-                            self.taxonomy["att"],
-                            self.taxonomy["rel"],
-                        )
-                        # Currently, only clips from the test set have been generated
-                        if info_clips is not None and ann_hoi_raw["id"] in info_clips:
-                            data["id_hoi_to_clip"][ann_hoi_raw["id"]] = Clip(
-                                ann_hoi_raw, info_clips[ann_hoi_raw["id"]]
-                            )
-                        data["id_hoi_to_id_sact"][ann_hoi_raw["id"]] = ann_sact_raw[
-                            "id"
-                        ]
-
-            self._save_cache(dir_moma, data, names, names_lazy)
-
-        for name in names_bidict:
-            data[name] = Bidict(data[name])
         for name in names:
             setattr(self, name, data[name])
 
@@ -180,12 +523,12 @@ class Lookup:
 
         return paradigm_and_split_to_ids_act
 
-    def retrieve(self, kind, key=None):
+    def retrieve(self, kind, key=None, dense=False):
         """
         Accesses the value given a key. There are several different ways to retrieve:
 
-            * Convert a ``split`` into ``ids_act`` (one-to-many):
-                ``retrieve(kind='id_act', key=split)``
+            * Convert a ``split`` into ``ids_act``, ``ids_sact`` or ``ids_hoi`` (one-to-many):
+                ``retrieve(kind='ids_act', 'ids_sact' or 'ids_hoi', key=split)``
             * Convert an ``id_act`` into an ``ann_act``, metadatum (one-to-one):
                 ``retrieve(kind='ann_act' or 'metadatum', key=id_act)``
             * Convert an ``id_sact`` into an ``ann_sact`` (one-to-one):
@@ -193,9 +536,18 @@ class Lookup:
             * Convert an ``id_hoi`` into an ``ann_hoi`` or a ``clip`` (one-to-one):
                 ``retrieve(kind='ann_hoi' or 'clip', key=id_hoi)``
 
+        Split membership is precomputed in the cache, and ``dense=True`` returns the sorted
+        dense IDs (see ``intern()``) of all instances or of the instances in a split.
+
         :param kind: indicates the type of retrieval that is used
         :type kind: Literal["paradigms","splits","ids_act","ids_sact","ids_hoi","anns_act","metadata","anns_sact","anns_hoi","clips",]
         """
+        if dense:
+            assert kind in ["ids_act", "ids_sact", "ids_hoi"]
+            if key is None:
+                return np.arange(len(self.columns[f"{kind[4:]}_id"]))
+            return self.columns[f"{kind[4:]}_split_{key}"]
+
         if key is None:
             assert kind in [
                 "paradigms",
@@ -238,6 +590,8 @@ class Lookup:
         else:
             assert kind in [
                 "ids_act",
+                "ids_sact",
+                "ids_hoi",
                 "ann_act",
                 "metadatum",
                 "ann_sact",
@@ -247,6 +601,8 @@ class Lookup:
 
             if kind == "ids_act":
                 return self.paradigm_and_split_to_ids_act[key]
+            elif kind in ["ids_sact", "ids_hoi"]:
+                return self.extern(kind[4:], self.columns[f"{kind[4:]}_split_{key}"])
             elif kind == "ann_act":
                 return self.id_act_to_ann_act[key]
             elif kind == "metadatum":
@@ -284,42 +640,238 @@ class Lookup:
 
         if id_hoi is not None:
             assert kind in ["id_act", "id_sact"]
-
-            if kind == "id_sact":
-                id_sact = self.id_hoi_to_id_sact[id_hoi]
-                return id_sact
-            elif kind == "id_act":
-                id_sact = self.id_hoi_to_id_sact[id_hoi]
-                id_act = self.id_sact_to_id_act[id_sact]
-                return id_act
+            return self.map_ids(kind.split("_")[1], ids_hoi=[id_hoi])[0]
 
         elif id_sact is not None:
             assert kind in ["id_act", "ids_hoi"]
-
-            if kind == "id_act":
-                id_act = self.id_sact_to_id_act[id_sact]
-                return id_act
-            elif kind == "ids_hoi":
-                ids_hoi = self.id_hoi_to_id_sact.inverse[id_sact]
-                return ids_hoi
+            ids = self.map_ids(kind.split("_")[1], ids_sact=[id_sact])
+            return ids[0] if kind == "id_act" else ids
 
         elif id_act is not None:
             assert kind in ["ids_sact", "ids_hoi"]
-
-            if kind == "ids_sact":
-                ids_sact = self.id_sact_to_id_act.inverse[id_act]
-                return ids_sact
-            elif kind == "ids_hoi":
-                ids_hoi = itertools.chain(
-                    *[
-                        self.id_hoi_to_id_sact.inverse[id_sact]
-                        for id_sact in self.id_sact_to_id_act.inverse[id_act]
-                    ]
-                )
-                return ids_hoi
+            return self.map_ids(kind.split("_")[1], ids_act=[id_act])
 
         raise ValueError
 
+    def intern(self, kind, ids):
+        """
+        Translates string instance IDs into dense integer instance IDs, which index the
+        arrays of the cache and follow the order of ``anns.json``
+
+        :param kind: ``'act'``, ``'sact'`` or ``'hoi'``
+        :return: a NumPy array of dense IDs
+        """
+        assert kind in ["act", "sact", "hoi"]
+        return self.columns.get_rows(kind, ids)
+
+    def extern(self, kind, ids):
+        """
+        Translates dense integer instance IDs back into string instance IDs
+
+        :param kind: ``'act'``, ``'sact'`` or ``'hoi'``
+        :return: a list of string IDs
+        """
+        assert kind in ["act", "sact", "hoi"]
+        return self.columns[f"{kind}_id"][ids].tolist()
+
+    def map_ids(self, kind, ids_act=None, ids_sact=None, ids_hoi=None, ordered=False):
+        """
+        Maps many instance IDs across the MOMA hierarchy in one vectorized call. Usage:
+
+            * Convert ``ids_act`` into ``ids_sact`` or ``ids_hoi`` (one-to-many):
+                ``map_ids(ids_act=ids_act, kind='sact' or 'hoi')``
+            * Convert ``ids_sact`` into ``ids_act`` (one-to-one) or ``ids_hoi`` (one-to-many):
+                ``map_ids(ids_sact=ids_sact, kind='act' or 'hoi')``
+            * Convert ``ids_hoi`` into ``ids_act`` or ``ids_sact`` (one-to-one):
+                ``map_ids(ids_hoi=ids_hoi, kind='act' or 'sact')``
+
+        IDs are given either as a list of string IDs or as a NumPy integer array of dense IDs
+        (see ``intern()``), and are returned in the same form. One-to-one mappings return one
+        ID per given ID, and one-to-many mappings return the children of all given IDs,
+        concatenated in the order of the given IDs.
+
+        :param ordered: list the children of each ID in temporal order rather than in the
+          order of ``anns.json``
+        """
+        assert sum([x is not None for x in [ids_act, ids_sact, ids_hoi]]) == 1
+        assert kind in ["act", "sact", "hoi"]
+
+        kind_src, ids = [
+            (kind_src, ids)
+            for kind_src, ids in [
+                ("act", ids_act),
+                ("sact", ids_sact),
+                ("hoi", ids_hoi),
+            ]
+            if ids is not None
+        ][0]
+        assert kind != kind_src
+
+        is_dense = isinstance(ids, np.ndarray) and ids.dtype.kind in "iu"
+        rows = ids if is_dense else self.intern(kind_src, ids)
+
+        if kind_src == "hoi":  # parent arrays
+            rows = self.columns["hoi_sact"][rows]
+            if kind == "act":
+                rows = self.columns["sact_act"][rows]
+        elif kind_src == "sact" and kind == "act":
+            rows = self.columns["sact_act"][rows]
+        else:  # CSR child offsets
+            rows = get_children(self.columns[f"{kind_src}_{kind}_offsets"], rows)
+            if ordered:
+                name_order = {
+                    ("act", "sact"): "sact_by_start",
+                    ("act", "hoi"): "hoi_by_time",
+                    ("sact", "hoi"): "hoi_by_sact_time",
+                }[(kind_src, kind)]
+                rows = self.columns[name_order][rows]
+
+        return rows if is_dense else self.extern(kind, rows)
+
+    def get_subset(self, ids_act=None, ids_sact=None, ids_hoi=None):
+        """
+        Closes a subset of instances over the MOMA hierarchy:
+
+            * Given ``ids_act``: the activities and the instances within them
+            * Given ``ids_sact``: the sub-activities, their activities and the higher-order
+              interactions within them
+            * Given ``ids_hoi``: the higher-order interactions, their sub-activities and their
+              activities
+
+        IDs are given either as string IDs or as a NumPy integer array of dense IDs.
+
+        :return: the sorted dense IDs of the activities, sub-activities and higher-order
+          interactions in the subset
+        :rtype: tuple[numpy.ndarray, numpy.ndarray, numpy.ndarray]
+        """
+        assert sum([x is not None for x in [ids_act, ids_sact, ids_hoi]]) == 1
+
+        kind, ids = [
+            (kind, ids)
+            for kind, ids in [("act", ids_act), ("sact", ids_sact), ("hoi", ids_hoi)]
+            if ids is not None
+        ][0]
+        is_dense = isinstance(ids, np.ndarray) and ids.dtype.kind in "iu"
+        rows = ids if is_dense else self.intern(kind, list(ids))
+        rows = np.unique(np.asarray(rows, dtype=np.int64))
+
+        if kind == "act":
+            rows_act = rows
+            rows_sact = get_children(self.columns["act_sact_offsets"], rows_act)
+            rows_hoi = get_children(self.columns["sact_hoi_offsets"], rows_sact)
+        elif kind == "sact":
+            rows_sact = rows
+            rows_act = np.unique(self.columns["sact_act"][rows_sact])
+            rows_hoi = get_children(self.columns["sact_hoi_offsets"], rows_sact)
+        else:
+            rows_hoi = rows
+            rows_sact = np.unique(self.columns["hoi_sact"][rows_hoi])
+            rows_act = np.unique(self.columns["sact_act"][rows_sact])
+
+        return rows_act, rows_sact, rows_hoi
+
+    def get_cids(self, kind, cnames):
+        """
+        Converts class names into sorted class IDs, ignoring class names that are not in the
+        taxonomy
+
+        :param kind: ``'act'``, ``'sact'``, ``'actor'``, ``'object'``, ``'att'`` or ``'rel'``
+        """
+        assert kind in ["act", "sact", "actor", "object", "att", "rel"]
+
+        if kind in ["att", "rel"]:
+            cnames_all = [x[0] for x in self.taxonomy[kind]]
+        else:
+            cnames_all = self.taxonomy[kind]
+        cnames = set(cnames)
+        return [cid for cid, cname in enumerate(cnames_all) if cname in cnames]
+
+    def find_ids(self, kind, cnames, dense=False):
+        """
+        Finds the instance IDs whose annotations involve any of the given class names. The
+        inverted indexes of the cache are intersected without loading any annotation. Usage:
+
+            * Find the ``ids_act`` of the given activity classes:
+                ``find_ids(kind='act', cnames=cnames_act)``
+            * Find the ``ids_sact`` of the given sub-activity classes:
+                ``find_ids(kind='sact', cnames=cnames_sact)``
+            * Find the ``ids_hoi`` that involve any of the given actor, object, attribute or
+              relationship classes:
+                ``find_ids(kind='actor', 'object', 'att' or 'rel', cnames=cnames)``
+
+        :param dense: return the sorted dense IDs (see ``intern()``) instead
+        :return: a sorted list of instance IDs
+        """
+        rows = self.columns.get_rows_by_cids(kind, self.get_cids(kind, cnames))
+        if dense:
+            return rows
+
+        kind_id = kind if kind in ["act", "sact"] else "hoi"
+        return sorted(self.extern(kind_id, rows))
+
+    def get_times(self, kind, ids):
+        """
+        Returns the start times of sub-activities or the times of higher-order interactions
+
+        :param kind: ``'sact'`` or ``'hoi'``
+        :param ids: a NumPy array of dense IDs
+        :return: a NumPy array of times in the full video
+        """
+        assert kind in ["sact", "hoi"]
+        return self.columns["sact_start" if kind == "sact" else "hoi_time"][ids]
+
+    def locate_sacts(self, id_act, times):
+        """
+        Finds the sub-activities of an activity that cover the given times, i.e.,
+        ``start <= time < end``. If sub-activities overlap, the one that starts last is returned.
+
+        :param times: a NumPy array of times relative to the full video
+        :return: a NumPy array of dense sub-activity IDs, or -1 for times without a sub-activity
+        """
+        row_act = self.intern("act", [id_act])[0]
+        offset_start, offset_end = self.columns["act_sact_offsets"][
+            row_act : row_act + 2
+        ]
+        rows = self.columns["sact_by_start"][offset_start:offset_end]
+        starts = self.columns["sact_start"][rows]
+        ends = self.columns["sact_end"][rows]
+        ends_max = self.columns["sact_end_max"][offset_start:offset_end]
+
+        indices = np.searchsorted(starts, times, side="right") - 1
+        is_covered = indices >= 0
+        is_covered[is_covered] = ends_max[indices[is_covered]] > times[is_covered]
+
+        ids = np.full(times.shape, -1, dtype=np.int64)
+        is_last = is_covered.copy()
+        is_last[is_covered] = ends[indices[is_covered]] > times[is_covered]
+        ids[is_last] = rows[indices[is_last]]
+
+        # times covered by an earlier sub-activity than the last one to start
+        for i in np.flatnonzero(is_covered & ~is_last):
+            index = indices[i]
+            while ends[index] <= times[i]:
+                index -= 1
+            ids[i] = rows[index]
+
+        return ids
+
+    def locate_hois(self, id_act, start, end):
+        """
+        Finds the higher-order interactions of an activity within ``[start, end)``
+
+        :param start: a time relative to the full video
+        :param end: a time relative to the full video
+        :return: a NumPy array of dense higher-order interaction IDs sorted by time
+        """
+        row_act = self.intern("act", [id_act])[0]
+        offset_start, offset_end = self.columns["act_hoi_offsets"][
+            row_act : row_act + 2
+        ]
+        rows = self.columns["hoi_by_time"][offset_start:offset_end]
+        times = self.columns["hoi_time"][rows]
+        index_start, index_end = np.searchsorted(times, [start, end], side="left")
+        return np.asarray(rows[index_start:index_end])
+
     def map_cid(self, paradigm, split=None, cid_act=None, cid_sact=None):
         assert sum([x is not None for x in [cid_act, cid_sact]]) == 1
         if cid_act is not None:
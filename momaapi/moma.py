@@ -1,18 +1,30 @@
-import itertools
+import atexit
+import os
 import os.path as osp
 
+import numpy as np
+
+from .cooccurrences import Cooccurrences
+from .data import Buffer, FileManifest
 from .taxonomy import Taxonomy
 from .lookup import Lookup
+from .query import Query, QueryCache
 from .statistics import Statistics
+from typing import Sequence, Union
 from typing_extensions import Literal
 
 
 """
 The following functions are defined:
+ - warm(): Construct the components that are otherwise constructed on first use
  - get_cids(): Get the class ID of a kind ('act', 'sact', etc.) that satisfies certain conditions
+ - get_cids_batch(): Get the class IDs of a kind for many thresholds at once
  - map_cids(): Map class IDs between standard class IDs and split-specific contiguous class IDs
  - get_cnames(): Given class IDs, return their class names
- - is_sact(): Check whether a certain time in an activity has a sub-activity
+ - is_sact(): Check whether certain times in an activity have a sub-activity
+ - get_id_sact(): Get the sub-activity that covers certain times in an activity
+ - get_ids_hoi_within(): Get the higher-order interactions of an activity within a time interval
+ - query(): Build a lazy, composable query for instance IDs
  - get_ids_act(): Get the unique activity instance IDs that satisfy certain conditions
  - get_ids_sact(): Get the unique sub-activity instance IDs that satisfy certain conditions
  - get_ids_hoi(): Get the unique higher-order interaction instance IDs that satisfy certain conditions
@@ -23,6 +35,7 @@ The following functions are defined:
  - get_clip(): Given higher-order interaction instance IDs, return their clips
  - get_paths(): Given instance IDs, return data paths
  - sort(): Given a list of sub-activity or higher-order interaction instance IDs, return them in sorted order
+ - sort_batch(): Given lists of sub-activity or higher-order interaction instance IDs, return each of them in sorted order
 
 The following paradigms are defined:
  - 'standard': Different splits share the same sets of activity classes and sub-activity classes
@@ -30,8 +43,10 @@ The following paradigms are defined:
 
 The following attributes are defined:
  - statistics: an object that stores dataset statistics; please see statistics.py:95 for details
+ - cooccurrences: an object that stores joint class counts; please see cooccurrences.py for details
  - taxonomy: an object that stores dataset taxonomy; please see taxonomy.py:53 for details
  - num_classes: number of activity and sub-activity classes
+ - files: a manifest of the video files that get_paths() checks paths against
 
  
 Definitions:
@@ -61,17 +76,46 @@ class MOMA:
     * ``cname``: class name
     * ``cid``: class ID
 
+    The taxonomy, lookup, statistics, co-occurrences and query cache are constructed on first
+    use, so that a MOMA object only loads what it needs. Call ``warm()`` to construct them
+    ahead of time.
+
     :param dir_moma: directory containing the MOMA dataset
     :type dir_moma: str
     :param paradigm: the experiment configuration, which is either ``'standard'`` or ``'few-shot'``
     :type paradigm: Literal['standard', 'few-shot']
     :param reset_cache: flag that indicates whether to reset cached data
     :type reset_cache: bool
+    :param backend: the storage backend of sub-activity, higher-order interaction and clip annotations,
+      which is either ``'pickle'`` (one pickled object per instance) or ``'columnar'``
+      (memory-mapped NumPy columns)
+    :type backend: Literal['pickle', 'columnar']
+    :param max_buffer_entries: the maximum number of unpickled annotations kept in memory, or
+      ``None`` for no limit
+    :type max_buffer_entries: Optional[int]
+    :param max_buffer_bytes: the maximum total size, measured as pickled bytes, of the
+      unpickled annotations kept in memory, or ``None`` for no limit
+    :type max_buffer_bytes: Optional[int]
+    :param buffer_policy: the eviction policy once a buffer bound is reached, which is either
+      ``'lru'`` (least recently used) or ``'clock'``; hit, miss and eviction counters are
+      available from ``moma.lookup.buffer.stats``
+    :type buffer_policy: Literal['lru', 'clock']
+    :param jobs: the number of worker processes used to compile the annotation cache
+    :type jobs: int
+    :param max_query_cache_entries: the maximum number of memoized query results, from which
+      the least recently used are evicted, or ``None`` for no limit; results are invalidated
+      with ``moma.query_cache.clear()``
+    :type max_query_cache_entries: Optional[int]
+    :param persist_query_cache: save the memoized query results under ``anns/cache`` at exit,
+      and load them back in later processes if the annotations are unchanged
+    :type persist_query_cache: bool
+
     :param taxonomy: a Taxonomy object containing information about the dataset taxonomy
     :type taxonomy: Taxonomy
     :param lookup: a Lookup object containing information about class IDs and class names
     :type lookup: Lookup
     :param statistics: a Statistics object that can generate dataset-level statics
+    :param cooccurrences: a Cooccurrences object that counts co-occurring classes
     :param num_classes: the number of classes contained in the MOMA object
     :type num_classes: int
     """
@@ -81,6 +125,13 @@ class MOMA:
         dir_moma: str,
         paradigm: Literal["standard", "few-shot"] = "standard",
         reset_cache: bool = False,
+        backend: Literal["pickle", "columnar"] = "pickle",
+        max_buffer_entries: int = None,
+        max_buffer_bytes: int = None,
+        buffer_policy: Literal["lru", "clock"] = "lru",
+        jobs: int = 1,
+        max_query_cache_entries: int = 256,
+        persist_query_cache: bool = False,
     ):
         """
         Constructor for MOMA-LRG
@@ -89,10 +140,100 @@ class MOMA:
 
         self.dir_moma = dir_moma
         self.paradigm = paradigm
+        self.files = FileManifest(osp.join(dir_moma, "videos"))
+
+        # components are constructed on first use, or by warm()
+        self._reset_cache = reset_cache
+        self._backend = backend
+        self._buffer = Buffer(max_buffer_entries, max_buffer_bytes, buffer_policy)
+        self._jobs = jobs
+        self._max_query_cache_entries = max_query_cache_entries
+        self._persist_query_cache = persist_query_cache
+        self._taxonomy = None
+        self._lookup = None
+        self._statistics = None
+        self._cooccurrences = None
+        self._query_cache = None
 
-        self.taxonomy = Taxonomy(dir_moma)
-        self.lookup = Lookup(dir_moma, self.taxonomy, reset_cache)
-        self.statistics = Statistics(dir_moma, self.taxonomy, self.lookup, reset_cache)
+    @property
+    def taxonomy(self):
+        if self._taxonomy is None:
+            self._taxonomy = Taxonomy(self.dir_moma)
+        return self._taxonomy
+
+    @property
+    def lookup(self):
+        if self._lookup is None:
+            self._lookup = Lookup(
+                self.dir_moma,
+                self.taxonomy,
+                self._reset_cache,
+                self._backend,
+                self._buffer,
+                self._jobs,
+            )
+        return self._lookup
+
+    @property
+    def statistics(self):
+        if self._statistics is None:
+            self._statistics = Statistics(
+                self.dir_moma, self.taxonomy, self.lookup, self._reset_cache
+            )
+        return self._statistics
+
+    @property
+    def cooccurrences(self):
+        if self._cooccurrences is None:
+            self._cooccurrences = Cooccurrences(
+                self.dir_moma, self.taxonomy, self.lookup, self._reset_cache
+            )
+        return self._cooccurrences
+
+    @property
+    def query_cache(self):
+        if self._query_cache is None:
+            path_query_cache = None
+            if self._persist_query_cache:
+                path_query_cache = osp.join(self.dir_moma, "anns/cache/queries")
+                if self._reset_cache and osp.exists(path_query_cache):
+                    os.remove(path_query_cache)
+            self._query_cache = QueryCache(
+                self._max_query_cache_entries, path_query_cache, self.lookup.fingerprint
+            )
+            if self._persist_query_cache:
+                atexit.register(self._query_cache.save)
+        return self._query_cache
+
+    def warm(
+        self,
+        components: Sequence[str] = (
+            "taxonomy",
+            "lookup",
+            "statistics",
+            "cooccurrences",
+            "query_cache",
+        ),
+    ) -> "MOMA":
+        """
+        Constructs components that are otherwise constructed on first use, e.g., before
+        forking worker processes so that they share them instead of each constructing its own
+
+        :param components: the names of the components to construct
+        :type components: Sequence[str]
+        :return: this MOMA object
+        :rtype: MOMA
+        """
+        for component in components:
+            assert component in [
+                "taxonomy",
+                "lookup",
+                "statistics",
+                "cooccurrences",
+                "query_cache",
+            ]
+            getattr(self, component)
+        return self
 
     @property
     def num_classes(self):
@@ -123,6 +264,26 @@ class MOMA:
         cids = self.statistics.get_cids(kind, threshold, self.paradigm, split)
         return cids
 
+    def get_cids_batch(
+        self,
+        kind: Literal["act", "sact", "actor", "object", "att", "rel"],
+        thresholds: Sequence[int],
+        split: Literal["train", "val", "test", "either", "all", "combined"],
+    ) -> list:
+        """
+        Batched ``get_cids()`` that retrieves the class IDs for many thresholds at once.
+
+        :param kind: the kind of annotations needed to be retrieved
+        :type kind: Literal['act', 'sact', 'actor', 'object', 'att', 'rel']
+        :param thresholds: exclude classes with fewer than each of these numbers of instances
+        :type thresholds: Sequence[int]
+        :param split: the split to be used for the retrieval, as in ``get_cids()``
+        :type split: Literal['train', 'val', 'test', 'either', 'all', 'combined']
+        :return: a list of class IDs for each threshold
+        :rtype: List[List[int]]
+        """
+        return self.statistics.get_cids_batch(kind, thresholds, self.paradigm, split)
+
     def map_cids(
         self,
         split: Literal["train", "val", "test", "either", "all", "combined"],
@@ -225,30 +386,100 @@ class MOMA:
         cnames = [self.taxonomy[kind][cid] for cid in cids]
         return cnames
 
-    def is_sact(self, id_act: int, time: int, absolute: bool = False) -> bool:
+    def _get_times(self, id_act, time, absolute):
+        times = np.asarray(time)
+        if not absolute:
+            ann_act = self.lookup.retrieve("ann_act", id_act)
+            times = ann_act.start + times
+        return times
+
+    def is_sact(
+        self, id_act: str, time: Union[float, np.ndarray], absolute: bool = False
+    ) -> Union[bool, np.ndarray]:
         """
-        Checks whether a certain time in an activity has a sub-activity.
+        Checks whether certain times in an activity have a sub-activity.
 
         :param id_act: activity ID
-        :type id_act: int
-        :param time: time in the activity
-        :type time: int
+        :type id_act: str
+        :param time: a time, or an array of times, in the activity
+        :type time: Union[float, np.ndarray]
         :param absolute: relative to the full video if ``True`` or relative to the
           activity video if ``False``
         :type absolute: bool
+        :return: whether the time has a sub-activity, or a boolean array for an array of times
+        :rtype: Union[bool, np.ndarray]
         """
-        if not absolute:
-            ann_act = self.lookup.retrieve("ann_act", id_act)
-            time = ann_act.start + time
+        times = self._get_times(id_act, time, absolute)
+        is_sact = self.lookup.locate_sacts(id_act, np.atleast_1d(times)) >= 0
+        return bool(is_sact[0]) if times.ndim == 0 else is_sact.reshape(times.shape)
+
+    def get_id_sact(
+        self, id_act: str, time: Union[float, np.ndarray], absolute: bool = False
+    ) -> Union[str, list]:
+        """
+        Get the sub-activity that covers certain times in an activity. If sub-activities
+        overlap, the one that starts last is returned.
+
+        :param id_act: activity ID
+        :type id_act: str
+        :param time: a time, or an array of times, in the activity
+        :type time: Union[float, np.ndarray]
+        :param absolute: relative to the full video if ``True`` or relative to the
+          activity video if ``False``
+        :type absolute: bool
+        :return: a sub-activity ID, or ``None`` if there is no sub-activity at that time; a
+          list of them for an array of times
+        :rtype: Union[str, list]
+        """
+        times = self._get_times(id_act, time, absolute)
+        rows = self.lookup.locate_sacts(id_act, np.atleast_1d(times).ravel())
+        ids_sact = [None] * len(rows)
+        indices = np.flatnonzero(rows >= 0)
+        for i, id_sact in zip(indices, self.lookup.extern("sact", rows[indices])):
+            ids_sact[i] = id_sact
+        return ids_sact[0] if times.ndim == 0 else ids_sact
+
+    def get_ids_hoi_within(
+        self, id_act: str, start: float, end: float, absolute: bool = False
+    ) -> list:
+        """
+        Get the higher-order interactions of an activity within a time interval.
 
-        is_sact = False
-        ids_sact = self.lookup.map_id("ids_sact", id_act=id_act)
-        for id_sact in ids_sact:
-            ann_sact = self.lookup.retrieve("ann_sact", id_sact)
-            if ann_sact.start <= time < ann_sact.end:
-                is_sact = True
+        :param id_act: activity ID
+        :type id_act: str
+        :param start: the inclusive start of the interval in the activity
+        :type start: float
+        :param end: the exclusive end of the interval in the activity
+        :type end: float
+        :param absolute: relative to the full video if ``True`` or relative to the
+          activity video if ``False``
+        :type absolute: bool
+        :return: a list of higher-order interaction IDs sorted by time
+        :rtype: list
+        """
+        start, end = self._get_times(id_act, [start, end], absolute).tolist()
+        return self.lookup.extern("hoi", self.lookup.locate_hois(id_act, start, end))
 
-        return is_sact
+    def query(self, kind: str) -> Query:
+        """
+        Build a lazy, composable query for the instance IDs of a kind, e.g.,
+        ``moma.query('hoi').split('train').actors(['adult']).rels(['touching']).ids()``.
+        Filters are ordered by their estimated selectivity upon evaluation, and results are
+        memoized in ``moma.query_cache``.
+
+        :param kind: the kind of instances to query, which is ``'act'``, ``'sact'`` or ``'hoi'``
+        :type kind: str
+        :return: a query without filters, which matches all instances of the kind
+        :rtype: Query
+        """
+        # statistics are only loaded once a query needs to order its filters
+        return Query(
+            self.lookup,
+            lambda: self.statistics,
+            self.paradigm,
+            kind,
+            cache=self.query_cache,
+        )
 
     def get_ids_act(
         self,
@@ -271,43 +502,17 @@ class MOMA:
         :return: a list of activity IDs
         :rtype: list
         """
-        if all(x is None for x in [split, cnames_act, ids_sact, ids_hoi]):
-            return sorted(self.lookup.retrieve("ids_act"))
-
-        ids_act_intersection = []
-
-        # split
+        query = self.query("act")
         if split is not None:
-            assert split in self.lookup.retrieve("splits")
-            ids_act_intersection.append(
-                self.lookup.retrieve("ids_act", f"{self.paradigm}_{split}")
-            )
-
-        # cnames_act
+            query = query.split(split)
         if cnames_act is not None:
-            ids_act = []
-            for id_act in self.lookup.retrieve("ids_act"):
-                ann_act = self.lookup.retrieve("ann_act", id_act)
-                if ann_act.cname in cnames_act:
-                    ids_act.append(id_act)
-            ids_act_intersection.append(ids_act)
-
-        # ids_sact
+            query = query.acts(cnames_act)
         if ids_sact is not None:
-            ids_act = [
-                self.lookup.map_id("id_act", id_sact=id_sact) for id_sact in ids_sact
-            ]
-            ids_act_intersection.append(ids_act)
-
-        # ids_hoi
+            query = query.ids_sact(ids_sact)
         if ids_hoi is not None:
-            ids_act = [
-                self.lookup.map_id("id_act", id_hoi=id_hoi) for id_hoi in ids_hoi
-            ]
-            ids_act_intersection.append(ids_act)
+            query = query.ids_hoi(ids_hoi)
 
-        ids_act_intersection = sorted(set.intersection(*map(set, ids_act_intersection)))
-        return ids_act_intersection
+        return query.ids()
 
     def get_ids_sact(self, split: str = None, cnames_sact: list = None, ids_act: list = None, ids_hoi: list = None,
                      cnames_actor: list = None, cnames_object: list = None, cnames_att: list = None,
@@ -335,78 +540,25 @@ class MOMA:
         :return: a list of sub-activity IDs
         :rtype: list
         """
-        if all(
-            x is None
-            for x in [
-                split,
-                cnames_sact,
-                ids_act,
-                ids_hoi,
-                cnames_actor,
-                cnames_object,
-                cnames_att,
-                cnames_rel,
-            ]
-        ):
-            return sorted(self.lookup.retrieve("ids_sact"))
-
-        ids_sact_intersection = []
-
-        # split
+        query = self.query("sact")
         if split is not None:
-            assert split in self.lookup.retrieve("splits")
-            ids_sact = self.get_ids_sact(ids_act=self.lookup.retrieve("ids_act", f"{self.paradigm}_{split}"))
-            ids_sact_intersection.append(ids_sact)
-
-        # cnames_sact
+            query = query.split(split)
         if cnames_sact is not None:
-            ids_sact = []
-            for id_sact in self.lookup.retrieve("ids_sact"):
-                ann_sact = self.lookup.retrieve("ann_sact", id_sact)
-                if ann_sact.cname in cnames_sact:
-                    ids_sact.append(id_sact)
-            ids_sact_intersection.append(ids_sact)
-
-        # ids_act
+            query = query.sacts(cnames_sact)
         if ids_act is not None:
-            ids_sact = itertools.chain(
-                *[self.lookup.map_id("ids_sact", id_act=id_act) for id_act in ids_act]
-            )
-            ids_sact_intersection.append(ids_sact)
-
-        # ids_hoi
+            query = query.ids_act(ids_act)
         if ids_hoi is not None:
-            ids_sact = [
-                self.lookup.map_id("id_sact", id_hoi=id_hoi) for id_hoi in ids_hoi
-            ]
-            ids_sact_intersection.append(ids_sact)
-
-        # cnames_actor, cnames_object, cnames_att, cnames_rel
-        if not all(
-            x is None
-            for x in [
-                cnames_actor,
-                cnames_object,
-                cnames_att,
-                cnames_rel,
-            ]
-        ):
-            kwargs = {
-                "cnames_actor": cnames_actor,
-                "cnames_object": cnames_object,
-                "cnames_att": cnames_att,
-                "cnames_rel": cnames_rel,
-            }
-            ids_sact = [
-                self.lookup.map_id("id_sact", id_hoi=id_hoi)
-                for id_hoi in self.get_ids_hoi(**kwargs)
-            ]
-            ids_sact_intersection.append(ids_sact)
-
-        ids_sact_intersection = sorted(
-            set.intersection(*map(set, ids_sact_intersection))
-        )
-        return ids_sact_intersection
+            query = query.ids_hoi(ids_hoi)
+        if cnames_actor is not None:
+            query = query.actors(cnames_actor)
+        if cnames_object is not None:
+            query = query.objects(cnames_object)
+        if cnames_att is not None:
+            query = query.atts(cnames_att)
+        if cnames_rel is not None:
+            query = query.rels(cnames_rel)
+
+        return query.ids()
 
     def get_ids_hoi(self, split: str = None, ids_act: list = None, ids_sact: list = None, cnames_actor: list = None,
                     cnames_object: list = None, cnames_att: list = None, cnames_rel: list = None) -> list:
@@ -429,65 +581,23 @@ class MOMA:
         :param cnames_rel: get higher-order interaction IDs [ids_hoi] for given relationship class names [cnames_rel]
         :type cnames_rel: list
         """
-        if all(
-            x is None
-            for x in [
-                split,
-                ids_act,
-                ids_sact,
-                cnames_actor,
-                cnames_object,
-                cnames_att,
-                cnames_rel,
-            ]
-        ):
-            return sorted(self.lookup.retrieve("ids_hoi"))
-
-        ids_hoi_intersection = []
-
-        # split
+        query = self.query("hoi")
         if split is not None:
-            assert split in self.lookup.retrieve("splits")
-            ids_hoi = self.get_ids_hoi(ids_act=self.lookup.retrieve("ids_act", f"{self.paradigm}_{split}"))
-            ids_hoi_intersection.append(ids_hoi)
-
-        # ids_act
+            query = query.split(split)
         if ids_act is not None:
-            ids_hoi = itertools.chain(
-                *[self.lookup.map_id("ids_hoi", id_act=id_act) for id_act in ids_act]
-            )
-            ids_hoi_intersection.append(ids_hoi)
-
-        # ids_sact
+            query = query.ids_act(ids_act)
         if ids_sact is not None:
-            ids_hoi = itertools.chain(
-                *[
-                    self.lookup.map_id("ids_hoi", id_sact=id_sact)
-                    for id_sact in ids_sact
-                ]
-            )
-            ids_hoi_intersection.append(ids_hoi)
-
-        # cnames_actor, cnames_object, cnames_att, cnames_rel
-        cnames_dict = {
-            "actors": cnames_actor,
-            "objects": cnames_object,
-            "atts": cnames_att,
-            "rels": cnames_rel,
-        }
-        for var, cnames in cnames_dict.items():
-            if cnames is not None:
-                ids_hoi = []
-                for id_hoi in self.lookup.retrieve("ids_hoi"):
-                    ann_hoi = self.lookup.retrieve("ann_hoi", id_hoi)
-                    if not set(cnames).isdisjoint(
-                        [x.cname for x in getattr(ann_hoi, var)]
-                    ):
-                        ids_hoi.append(id_hoi)
-                ids_hoi_intersection.append(ids_hoi)
-
-        ids_hoi_intersection = sorted(set.intersection(*map(set, ids_hoi_intersection)))
-        return ids_hoi_intersection
+            query = query.ids_sact(ids_sact)
+        if cnames_actor is not None:
+            query = query.actors(cnames_actor)
+        if cnames_object is not None:
+            query = query.objects(cnames_object)
+        if cnames_att is not None:
+            query = query.atts(cnames_att)
+        if cnames_rel is not None:
+            query = query.rels(cnames_rel)
+
+        return query.ids()
 
     def get_metadata(self, ids_act: list) -> list:
         """
@@ -563,7 +673,8 @@ class MOMA:
         :type id_hoi_clip: str
         :param full_res: return full-resolution videos
         :type full_res: bool
-        :param sanity_check: check that the video exists
+        :param sanity_check: check that the video exists, against a listing of the video
+          directories that is made once and updated with ``moma.files.refresh()``
         :type sanity_check: bool
         :return: paths to the videos
         :rtype: list
@@ -603,12 +714,12 @@ class MOMA:
             ] + [osp.join(self.dir_moma, f"videos/interaction/{id_hoi_clip}.jpg")]
             paths = [x for _, x in sorted(zip(times, paths))]
 
-        if sanity_check and not all(osp.exists(path) for path in paths):
-            paths_missing = [path for path in paths if not osp.exists(path)]
-            paths_missing = (
-                paths_missing[:5] if len(paths_missing) > 5 else paths_missing
-            )
-            assert False, f"{len(paths_missing)} paths do not exist: {paths_missing}"
+        # checked against a listing of the video directories; see moma.files.refresh()
+        if sanity_check:
+            is_missing = ~self.files.exists(paths)
+            if is_missing.any():
+                paths_missing = [paths[i] for i in np.flatnonzero(is_missing)[:5]]
+                assert False, f"{is_missing.sum()} paths do not exist: {paths_missing}"
 
         return paths
 
@@ -623,7 +734,7 @@ class MOMA:
         :type ids_sact: list
         :param ids_hoi: higher-order interaction instance IDs
         :type ids_hoi: list
-        :param sanity_check: check that the video exists
+        :param sanity_check: check that the IDs come from the same parent instance
         :type sanity_check: bool
         :return: sorted IDs
         :rtype: list
@@ -631,20 +742,48 @@ class MOMA:
         assert sum([x is not None for x in [ids_sact, ids_hoi]]) == 1
 
         if ids_sact is not None:
-            if sanity_check:  # make sure they come from the same activity instance
-                id_act = self.get_ids_act(ids_sact=[ids_sact[0]])[0]
-                ids_sact_all = self.get_ids_sact(ids_act=[id_act])
-                assert set(ids_sact).issubset(set(ids_sact_all))
-            ids_sact = sorted(
-                ids_sact, key=lambda x: self.get_anns_sact(ids_sact=[x])[0].start
-            )
-            return ids_sact
+            return self.sort_batch(groups_sact=[ids_sact], sanity_check=sanity_check)[0]
         else:
-            if sanity_check:  # make sure they come from the same sub-activity instance
-                id_sact = self.get_ids_sact(ids_hoi=[ids_hoi[0]])[0]
-                ids_hoi_all = self.get_ids_hoi(ids_sact=[id_sact])
-                assert set(ids_hoi).issubset(set(ids_hoi_all))
-            ids_hoi = sorted(
-                ids_hoi, key=lambda x: self.get_anns_hoi(ids_hoi=[x])[0].time
-            )
-            return ids_hoi
+            return self.sort_batch(groups_hoi=[ids_hoi], sanity_check=sanity_check)[0]
+
+    def sort_batch(
+        self,
+        groups_sact: list = None,
+        groups_hoi: list = None,
+        sanity_check: bool = True,
+    ) -> list:
+        """
+        Given lists of sub-activity or higher-order interaction instance IDs, return each of them
+        in sorted order by when they occured in the video. All lists are sorted at once by the
+        start times of sub-activities or the times of higher-order interactions, and instances
+        at the same time keep their order.
+
+        :param groups_sact: lists of sub-activity instance IDs, each from the same activity
+        :type groups_sact: list
+        :param groups_hoi: lists of higher-order interaction instance IDs, each from the same
+          sub-activity
+        :type groups_hoi: list
+        :param sanity_check: check that the IDs of each list come from the same parent instance
+        :type sanity_check: bool
+        :return: a list of sorted IDs for each list
+        :rtype: list
+        """
+        assert sum([x is not None for x in [groups_sact, groups_hoi]]) == 1
+        kind, groups = (
+            ("sact", groups_sact) if groups_sact is not None else ("hoi", groups_hoi)
+        )
+
+        ids = [x for group in groups for x in group]
+        rows = self.lookup.intern(kind, ids)
+        lengths = [len(group) for group in groups]
+        labels = np.repeat(np.arange(len(groups)), lengths)
+        offsets = np.cumsum([0] + lengths)
+
+        if sanity_check:  # make sure each list comes from the same parent instance
+            kind_parent = "act" if kind == "sact" else "sact"
+            parents = self.lookup.map_ids(kind_parent, **{f"ids_{kind}": rows})
+            assert (parents == parents[np.repeat(offsets[:-1], lengths)]).all()
+
+        order = np.lexsort((self.lookup.get_times(kind, rows), labels))
+        ids = [ids[i] for i in order]
+        return [ids[start:end] for start, end in zip(offsets[:-1], offsets[1:])]
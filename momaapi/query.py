@@ -0,0 +1,333 @@
+import os.path as osp
+import pickle
+
+import numpy as np
+
+from .data import Buffer
+from .utils import open_atomic
+
+"""
+A lazy, composable query over the instances of one level of the MOMA hierarchy, e.g.,
+ - moma.query('hoi').split('train').actors(['adult']).rels(['touching']).ids()
+
+Filters are only recorded until the query is evaluated. Upon evaluation, they are ordered by
+the selectivity estimated from the dataset statistics, and applied to sorted arrays of dense
+instance IDs (see Lookup.intern()), stopping as soon as no candidate is left. Statistics are
+only loaded when a query whose result is not cached has more than one filter to order.
+
+Filters on a level above the queried one select the descendants of the matching instances,
+and filters on a level below select the ancestors of the matching instances. Class name
+filters on the same lower level must match the same instance, whereas instance ID filters are
+matched independently, which is consistent with MOMA.get_ids_*().
+
+Results are memoized in a QueryCache keyed by the paradigm, the kind and the normalized
+filters, so that equivalent queries with differently ordered filters or class names share
+their results.
+"""
+
+levels = ["act", "sact", "hoi"]
+kind_to_level = {
+    "act": "act",
+    "sact": "sact",
+    "hoi": "hoi",
+    "actor": "hoi",
+    "object": "hoi",
+    "att": "hoi",
+    "rel": "hoi",
+}
+
+
+class Query:
+    """
+    A query for the instances of a kind that satisfy all of its filters. Each filter returns a
+    new query, so that partial queries can be shared and extended.
+
+    :param get_statistics: a function that returns the dataset statistics
+    :type get_statistics: Callable[[], Statistics]
+    :param kind: the kind of the queried instances, which is ``'act'``, ``'sact'`` or ``'hoi'``
+    :type kind: str
+    """
+
+    def __init__(self, lookup, get_statistics, paradigm, kind, filters=(), cache=None):
+        assert kind in levels
+        self._lookup = lookup
+        self._get_statistics = get_statistics
+        self._cache = cache
+        self.paradigm = paradigm
+        self.kind = kind
+        self.filters = filters
+
+    def _add(self, *filter):
+        return Query(
+            self._lookup,
+            self._get_statistics,
+            self.paradigm,
+            self.kind,
+            self.filters + (filter,),
+            self._cache,
+        )
+
+    def split(self, split):
+        """
+        Keeps the instances in the given dataset split of the query's paradigm
+        """
+        assert split in self._lookup.retrieve("splits")
+        return self._add("split", self.kind, split)
+
+    def acts(self, cnames):
+        """
+        Keeps the instances of, or within, activities of the given classes
+        """
+        return self._add("cnames", "act", cnames)
+
+    def sacts(self, cnames):
+        """
+        Keeps the instances of, within or containing sub-activities of the given classes
+        """
+        return self._add("cnames", "sact", cnames)
+
+    def actors(self, cnames):
+        """
+        Keeps the instances involving actors of any of the given classes
+        """
+        return self._add("cnames", "actor", cnames)
+
+    def objects(self, cnames):
+        """
+        Keeps the instances involving objects of any of the given classes
+        """
+        return self._add("cnames", "object", cnames)
+
+    def atts(self, cnames):
+        """
+        Keeps the instances involving attributes of any of the given classes
+        """
+        return self._add("cnames", "att", cnames)
+
+    def rels(self, cnames):
+        """
+        Keeps the instances involving relationships of any of the given classes
+        """
+        return self._add("cnames", "rel", cnames)
+
+    def ids_act(self, ids_act):
+        """
+        Keeps the instances of, or within, the given activities
+        """
+        return self._add("ids", "act", ids_act)
+
+    def ids_sact(self, ids_sact):
+        """
+        Keeps the instances of, within or containing the given sub-activities
+        """
+        return self._add("ids", "sact", ids_sact)
+
+    def ids_hoi(self, ids_hoi):
+        """
+        Keeps the instances of, or containing, the given higher-order interactions
+        """
+        return self._add("ids", "hoi", ids_hoi)
+
+    def _get_selectivity(self, filter):
+        """
+        Estimates the fraction of the instances of its level that a filter keeps
+        """
+        type_filter, kind, value = filter
+        level = kind_to_level[kind]
+        statistics = self._get_statistics()
+        num_total = max(statistics["all"][level]["num_instances"], 1)
+
+        if type_filter == "split":
+            key = f"{self.paradigm}_{value}"
+            return statistics[key][level]["num_instances"] / num_total
+        elif type_filter == "cnames":
+            # for entities and predicates, instances are counted in lieu of interactions
+            distribution = statistics["all"][kind]["distribution"]
+            cids = self._lookup.get_cids(kind, value)
+            return min(distribution[cids].sum() / num_total, 1)
+        else:
+            return len(value) / num_total
+
+    def _get_ids_dense(self, filter):
+        type_filter, kind, value = filter
+
+        if type_filter == "split":
+            key = f"{self.paradigm}_{value}"
+            return self._lookup.retrieve(f"ids_{kind}", key, dense=True)
+        elif type_filter == "cnames":
+            return self._lookup.find_ids(kind, value, dense=True)
+        else:
+            return np.unique(self._lookup.intern(kind, value))
+
+    def _apply(self, ids, ids_level, level):
+        """
+        Narrows the candidate dense IDs of the query given the matches of a group of filters
+        """
+        depth, depth_level = levels.index(self.kind), levels.index(level)
+
+        if depth_level < depth:  # matches are ancestors
+            if ids is None:  # descendants of sorted IDs are sorted
+                return self._lookup.map_ids(self.kind, **{f"ids_{level}": ids_level})
+            ancestors = self._lookup.map_ids(level, **{f"ids_{self.kind}": ids})
+            return ids[np.isin(ancestors, ids_level)]
+
+        if depth_level > depth:  # matches are descendants
+            ids_level = np.unique(
+                self._lookup.map_ids(self.kind, **{f"ids_{level}": ids_level})
+            )
+        if ids is None:
+            return ids_level
+        return np.intersect1d(ids, ids_level, assume_unique=True)
+
+    def evaluate(self):
+        """
+        :return: the sorted dense IDs of the matching instances, which must not be modified
+          since they may be shared with the cache
+        :rtype: numpy.ndarray
+        """
+        if self._cache is None:
+            return self._evaluate()
+
+        key = QueryCache.get_key(self.paradigm, self.kind, self.filters)
+        ids = self._cache.get(key)
+        if ids is None:
+            ids = self._evaluate()
+            self._cache.put(key, ids)
+        return ids
+
+    def _evaluate(self):
+        # class name filters on the same level are intersected before mapping
+        groups = {}
+        for i, filter in enumerate(self.filters):
+            level = kind_to_level[filter[1]]
+            key = level if filter[0] == "cnames" else i
+            # a single filter needs no ordering, and thus no statistics
+            selectivity = self._get_selectivity(filter) if len(self.filters) > 1 else 1
+            groups.setdefault(key, (level, []))[1].append((selectivity, filter))
+
+        ids = None
+        for level, filters in sorted(
+            groups.values(), key=lambda x: np.prod([y[0] for y in x[1]])
+        ):
+            ids_level = None
+            for _, filter in sorted(filters, key=lambda x: x[0]):
+                ids_filter = self._get_ids_dense(filter)
+                if ids_level is None:
+                    ids_level = ids_filter
+                else:
+                    ids_level = np.intersect1d(
+                        ids_level, ids_filter, assume_unique=True
+                    )
+                if len(ids_level) == 0:
+                    break
+
+            ids = self._apply(ids, ids_level, level)
+            if len(ids) == 0:
+                return np.zeros(0, dtype=np.int64)
+
+        if ids is None:
+            return self._lookup.retrieve(f"ids_{self.kind}", dense=True)
+        return np.asarray(ids, dtype=np.int64)
+
+    def ids(self):
+        """
+        :return: the sorted instance IDs of the matching instances
+        :rtype: list
+        """
+        return sorted(self._lookup.extern(self.kind, self.evaluate()))
+
+    def __iter__(self):
+        return iter(self.ids())
+
+    def __len__(self):
+        return len(self.evaluate())
+
+    def __repr__(self):
+        filters = []
+        for type_filter, kind, value in self.filters:
+            if type_filter == "split":
+                filters.append(f".split({value!r})")
+            elif type_filter == "cnames":
+                filters.append(f".{kind}s({value!r})")
+            else:
+                filters.append(f".ids_{kind}({value!r})")
+        return f"Query({self.kind!r}){''.join(filters)}"
+
+
+class QueryCache:
+    """
+    A cache of query results bounded by a number of entries, from which the least recently used
+    results are evicted. Results are keyed by the normalized arguments of a query.
+
+    If ``path`` is given, results can be saved to a file stamped with the fingerprint of the
+    annotation sources, which is loaded back on construction so that later processes start
+    with a warm cache. A file saved from different sources is ignored.
+
+    :param max_entries: the maximum number of cached results, or ``None`` for no limit
+    :type max_entries: Optional[int]
+    """
+
+    def __init__(self, max_entries=256, path=None, fingerprint=None):
+        self.buffer = Buffer(max_entries=max_entries)
+        self.path = path
+        self.fingerprint = fingerprint
+        if path is not None:
+            self.load()
+
+    @staticmethod
+    def get_key(paradigm, kind, filters):
+        """
+        Normalizes the arguments of a query, as the order of filters and of the class names
+        and instance IDs given to a filter do not matter
+        """
+        filters_normalized = []
+        for type_filter, kind_filter, value in filters:
+            if type_filter != "split":
+                value = tuple(sorted(set(value)))
+            filters_normalized.append((type_filter, kind_filter, value))
+        return paradigm, kind, tuple(sorted(filters_normalized))
+
+    def get(self, key):
+        return self.buffer.get(key)
+
+    def put(self, key, ids):
+        ids = np.array(ids, dtype=np.int64)
+        ids.flags.writeable = False
+        self.buffer.put(key, ids, ids.nbytes)
+
+    def clear(self):
+        """
+        Invalidates all cached results
+        """
+        self.buffer.clear()
+
+    @property
+    def stats(self):
+        return self.buffer.stats
+
+    def load(self):
+        if not osp.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            cache = pickle.load(f)
+        if cache.get("fingerprint") != self.fingerprint:
+            return
+
+        for key, ids in cache["results"]:
+            self.put(key, ids)
+
+    def save(self):
+        """
+        Saves the cached results, from the least to the most recently used
+        """
+        assert self.path is not None
+        results = [(key, record[0]) for key, record in self.buffer.records.items()]
+        with open_atomic(self.path, "wb") as f:
+            pickle.dump({"fingerprint": self.fingerprint, "results": results}, f)
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def __repr__(self):
+        return f"QueryCache(stats={self.stats})"
@@ -1,54 +1,194 @@
-import itertools
+import copy
 import json
-import jsbeautifier
 import numpy as np
 import os
 import os.path as osp
 
+from .data import (
+    Buffer,
+    DictView,
+    concatenate_groups,
+    expand_groups,
+    get_children_grouped,
+    hash_rows,
+)
+from .utils import load_or_compile, open_atomic
+
+
+def _count(groups, cids, num_groups, num_classes, weights=None):
+    """
+    Returns a (group × class) matrix of instance counts, or of the sums of ``weights``
+    """
+    counts = np.bincount(
+        groups * num_classes + cids, weights, minlength=num_groups * num_classes
+    )
+    return counts.astype(np.int64).reshape(num_groups, num_classes)
+
+
+def _reduce(groups, totals, mins, maxs, num_groups):
+    """
+    Returns the total, minimum and maximum duration in each group given those of its members,
+    where groups without durations have a total of 0 and NaN otherwise
+    """
+    counts = np.bincount(groups, minlength=num_groups)
+    totals = np.bincount(groups, totals, minlength=num_groups)
+    mins_group, maxs_group = np.full(num_groups, np.nan), np.full(num_groups, np.nan)
+
+    is_nonempty = counts > 0
+    if is_nonempty.any():
+        order = np.argsort(groups, kind="stable")
+        starts = (np.cumsum(counts) - counts)[is_nonempty]
+        # members without durations have NaN extremes, which fmin and fmax skip
+        mins_group[is_nonempty] = np.fmin.reduceat(mins[order], starts)
+        maxs_group[is_nonempty] = np.fmax.reduceat(maxs[order], starts)
+
+    return totals, mins_group, maxs_group
+
+
+def _merge(partials, groups, rows, num_groups):
+    """
+    Merges the partial statistics of the given rows into the groups they are labeled with
+    """
+    merged = {}
+    for name, values in partials.items():
+        values = values[rows]
+        if name.startswith("distribution."):
+            num_classes = values.shape[1]
+            merged[name] = _count(
+                np.repeat(groups, num_classes),
+                np.tile(np.arange(num_classes), len(groups)),
+                num_groups,
+                num_classes,
+                values.ravel(),
+            )
+        elif name.startswith("duration."):
+            merged[name] = np.stack(_reduce(groups, *values.T, num_groups), axis=1)
+        else:
+            merged[name] = np.bincount(groups, values, minlength=num_groups).astype(
+                values.dtype
+            )
+    return merged
+
 
-class Statistics(dict):
-    def __init__(self, dir_moma, taxonomy, lookup, reset_cache):
+class Statistics(DictView):
+    def __init__(self, dir_moma, taxonomy, lookup, reset_cache, max_cache_entries=64):
         super().__init__()
         self._taxonomy = taxonomy
         self._lookup = lookup
+        self._buffer = Buffer(max_entries=max_cache_entries)
         self.statistics = self._read_statistics(dir_moma, reset_cache)
+        self.matrices = {}  # (paradigm, kind) -> (split × class) count matrix
+        # (kind, paradigm, split) -> class IDs sorted by count, and the sorted counts
+        self._sorted = {}
+        self._index_distributions()
         self._sanity_check()
 
-    def get_cids(self, kind, threshold, paradigm, split):
+    def _index_distributions(self):
+        """
+        Stacks the class distributions of each paradigm and kind into a (split × class) count
+        matrix, whose last row is the distribution of the entire dataset
+        """
+        splits = self._lookup.retrieve("splits")
+        for paradigm in self._lookup.retrieve("paradigms"):
+            for kind in ["act", "sact", "actor", "object", "att", "rel"]:
+                self.matrices[(paradigm, kind)] = np.stack(
+                    [
+                        self.statistics[f"{paradigm}_{split}"][kind]["distribution"]
+                        for split in splits
+                    ]
+                    + [self.statistics["all"][kind]["distribution"]]
+                )
+
+    def get_distribution(self, kind, paradigm, split):
+        """
+        :return: the number of instances of each class in a split, or, for ``'either'`` and
+          ``'all'``, the smallest and the largest number across splits, respectively
+        :rtype: numpy.ndarray
+        """
         assert paradigm in self._lookup.retrieve("paradigms")
         assert split in self._lookup.retrieve("splits") + ["either", "all", "combined"]
 
-        # exclude a class if the smallest number of instances in across splits is less than the threshold
+        matrix = self.matrices[(paradigm, kind)]
         if split == "either":
-            distribution = np.stack(
-                [
-                    self.statistics[f"{paradigm}_{_split}"][kind]["distribution"]
-                    for _split in self._lookup.retrieve("splits")
-                ]
-            )
-            distribution = np.amin(distribution, axis=0)
-
-        # exclude a class if the largest number of instances in across splits is less than the threshold
+            return np.amin(matrix[:-1], axis=0)
         elif split == "all":
-            distribution = np.stack(
-                [
-                    self.statistics[f"{paradigm}_{_split}"][kind]["distribution"]
-                    for _split in self._lookup.retrieve("splits")
-                ]
-            )
-            distribution = np.amax(distribution, axis=0)
-
-        # exclude a class if the number of instances in the entire dataset is less than the threshold
+            return np.amax(matrix[:-1], axis=0)
         elif split == "combined":
-            distribution = np.array(self.statistics["all"][kind]["distribution"])
+            return matrix[-1]
+        return matrix[self._lookup.retrieve("splits").index(split)]
+
+    def _get_sorted(self, kind, paradigm, split):
+        """
+        :return: the class IDs sorted by their number of instances, and the sorted numbers
+        """
+        key = (kind, paradigm, split)
+        if key not in self._sorted:
+            distribution = self.get_distribution(kind, paradigm, split)
+            cids = np.argsort(distribution, kind="stable")
+            self._sorted[key] = (cids, distribution[cids])
+        return self._sorted[key]
 
-        else:
-            distribution = np.array(
-                self.statistics[f"{paradigm}_{split}"][kind]["distribution"]
-            )
+    def get_cids(self, kind, threshold, paradigm, split):
+        """
+        :return: the class IDs with at least ``threshold`` instances in a split, where a class
+          must meet the threshold in every split for ``'either'``, in any split for ``'all'``,
+          and in the entire dataset for ``'combined'``
+        :rtype: list[int]
+        """
+        return self.get_cids_batch(kind, [threshold], paradigm, split)[0]
+
+    def get_cids_batch(self, kind, thresholds, paradigm, split):
+        """
+        Batched ``get_cids()``. Class IDs are sorted by their number of instances once, after
+        which the classes that meet a threshold are located by binary search.
+
+        :param thresholds: the thresholds
+        :type thresholds: Sequence[int]
+        :return: the class IDs for each threshold
+        :rtype: list[list[int]]
+        """
+        cids, counts = self._get_sorted(kind, paradigm, split)
+        indices = np.searchsorted(counts, thresholds, side="left")
+        return [np.sort(cids[index:]).tolist() for index in indices.tolist()]
+
+    def compute(self, ids_act=None, ids_sact=None, ids_hoi=None, cache=True):
+        """
+        Computes statistics for a subset of instances, with the same structure as the statistics
+        of a dataset split. The subset is closed over the MOMA hierarchy:
+
+            * Given ``ids_act``: the activities and the instances within them
+            * Given ``ids_sact``: the sub-activities, their activities and the higher-order
+              interactions within them
+            * Given ``ids_hoi``: the higher-order interactions, their sub-activities and their
+              activities
+
+        The numbers of entity instances across frames (``num_instances_video``) are those of
+        whole sub-activities.
+
+        :param ids_act: string activity IDs or a NumPy array of dense activity IDs
+        :param ids_sact: string sub-activity IDs or a NumPy array of dense sub-activity IDs
+        :param ids_hoi: string higher-order interaction IDs or a NumPy array of dense IDs
+        :param cache: whether to reuse the statistics computed for the same subset, which are
+          keyed by a hash of the subset
+        :type cache: bool
+        :rtype: dict
+        """
+        rows_act, rows_sact, rows_hoi = self._lookup.get_subset(
+            ids_act, ids_sact, ids_hoi
+        )
+
+        key = None
+        if cache:
+            key = hash_rows(rows_act, rows_sact, rows_hoi)
+            statistics = self._buffer.get(key)
+            if statistics is not None:
+                return copy.deepcopy(statistics)
 
-        cids = np.where(distribution >= threshold)[0].tolist()
-        return cids
+        statistics = self._get_statistics([rows_act], [rows_sact], [rows_hoi])[0]
+
+        if cache:
+            self._buffer.put(key, copy.deepcopy(statistics), 1)
+        return statistics
 
     def _sanity_check(self):
         # standard
@@ -104,217 +244,262 @@ class Statistics(dict):
         )
 
     def _save_cache(self, path_statistics, statistics):
-        with open(path_statistics, "w") as f:
-            options = jsbeautifier.default_options()
-            options.indent_size = 4
-            f.write(jsbeautifier.beautify(json.dumps(statistics), options))
+        """
+        Saves distributions as arrays and all other statistics in a JSON header
+        """
+        header, arrays = {}, {}
+        for key, statistics_key in statistics.items():
+            header[key] = {}
+            for kind, statistics_kind in statistics_key.items():
+                header[key][kind] = {
+                    name: value
+                    for name, value in statistics_kind.items()
+                    if name != "distribution"
+                }
+                if "distribution" in statistics_kind:
+                    arrays[f"{key}.{kind}"] = statistics_kind["distribution"]
+        header = {"fingerprint": self._lookup.fingerprint, "statistics": header}
+
+        with open_atomic(path_statistics, "wb") as f:
+            np.savez(f, header=np.array(json.dumps(header)), **arrays)
+
+        # caches written by older APIs are superseded
+        for fname in ["statistics.json", "statistics_summaries"]:
+            path = osp.join(osp.dirname(path_statistics), fname)
+            if osp.exists(path):
+                os.remove(path)
 
     def _load_cache(self, path_statistics):
-        with open(path_statistics, "r") as f:
-            statistics = json.load(f)
+        with np.load(path_statistics) as cache:
+            header = json.loads(cache["header"].item())
+
+            # statistics compiled from different sources or by an older API are stale
+            if header.get("fingerprint") != self._lookup.fingerprint:
+                return None
+
+            statistics = header["statistics"]
+            for key, statistics_key in statistics.items():
+                for kind, statistics_kind in statistics_key.items():
+                    if f"{key}.{kind}" in cache:
+                        statistics_kind["distribution"] = cache[f"{key}.{kind}"]
         return statistics
 
-    def _read_statistics(self, dir_moma, reset_cache):
-        paradigms = self._lookup.retrieve("paradigms")
-        splits = self._lookup.retrieve("splits")
-
-        path_statistics = osp.join(dir_moma, "anns/cache/statistics.json")
-        if reset_cache and osp.exists(path_statistics):
-            os.remove(path_statistics)
+    def export(self, path):
+        """
+        Exports the statistics as pretty-printed JSON
 
-        if osp.exists(path_statistics):
-            statistics = self._load_cache(path_statistics)
+        :param path: the path to the JSON file
+        :type path: str
+        """
+        # jsbeautifier is only needed to export statistics
+        import jsbeautifier
 
-        else:
-            print("Compiling the Statistics class...")
-            statistics = {"all": self._get_statistics()}
-            for paradigm, split in itertools.product(paradigms, splits):
-                statistics[f"{paradigm}_{split}"] = self._get_statistics(
-                    paradigm, split
-                )
-            self._save_cache(path_statistics, statistics)
+        statistics = json.dumps(self.statistics, default=lambda x: x.tolist())
+        with open(path, "w") as f:
+            options = jsbeautifier.default_options()
+            options.indent_size = 4
+            f.write(jsbeautifier.beautify(statistics, options))
+
+    def _read_partials(self, path_partials):
+        """
+        Returns the partial statistics of each activity, reusing the partials of the activities
+        whose annotations are unchanged since the last compile, as identified by the digests of
+        the Lookup cache
+        """
+        rows_act = self._lookup.retrieve("ids_act", dense=True)
+        digests = self._lookup.get_digests()
+        digests = np.array(
+            [digests[id_act] for id_act in self._lookup.extern("act", rows_act)],
+            dtype=str,
+        )
 
-        return statistics
+        partials_old, rows_old = {}, np.full(len(rows_act), -1, dtype=np.int64)
+        if osp.exists(path_partials):
+            with np.load(path_partials) as cache:
+                partials_old = {name: cache[name] for name in cache.files}
+            digest_to_row = {
+                digest: row for row, digest in enumerate(partials_old.pop("digests"))
+            }
+            rows_old = np.array(
+                [digest_to_row.get(digest, -1) for digest in digests], dtype=np.int64
+            )
 
-    @staticmethod
-    def _get_duration(anns):
-        duration_total = sum(ann.end - ann.start for ann in anns)
-        duration_avg = duration_total / len(anns)
-        duration_min = min(ann.end - ann.start for ann in anns)
-        duration_max = max(ann.end - ann.start for ann in anns)
-        return duration_total, duration_avg, duration_min, duration_max
-
-    def _get_statistics(self, paradigm=None, split=None):
-        # subsample metadata, anns_act, anns_sact, and anns_hoi
-        if paradigm is None and split is None:
-            metadata = self._lookup.retrieve("metadata")
-            anns_act = self._lookup.retrieve("anns_act")
-            anns_sact = self._lookup.retrieve("anns_sact")
-            anns_hoi = self._lookup.retrieve("anns_hoi")
+        # only activities with new digests are aggregated, each as a group of its own
+        is_new = rows_old < 0
+        if is_new.all():
+            partials = self._get_partials(np.split(rows_act, len(rows_act)))
         else:
-            assert paradigm is not None and split is not None
-            ids_act = self._lookup.retrieve("ids_act", f"{paradigm}_{split}")
-            metadata = [
-                self._lookup.retrieve("metadatum", id_act) for id_act in ids_act
-            ]
-            anns_act = [self._lookup.retrieve("ann_act", id_act) for id_act in ids_act]
-            ids_sact = list(
-                itertools.chain(
-                    *[
-                        self._lookup.map_id("ids_sact", id_act=id_act)
-                        for id_act in ids_act
-                    ]
-                )
-            )
-            anns_sact = [
-                self._lookup.retrieve("ann_sact", id_sact) for id_sact in ids_sact
-            ]
-            ids_hoi = list(
-                itertools.chain(
-                    *[
-                        self._lookup.map_id("ids_hoi", id_sact=id_sact)
-                        for id_sact in ids_sact
-                    ]
-                )
-            )
-            anns_hoi = [self._lookup.retrieve("ann_hoi", id_hoi) for id_hoi in ids_hoi]
-
-        # number of classes and instances
-        num_acts = len(anns_act)
-        num_classes_act = len(set([ann_act.cid for ann_act in anns_act]))
-        num_sacts = len(anns_sact)
-        num_classes_sact = len(set([ann_sact.cid for ann_sact in anns_sact]))
-        num_hois = len(anns_hoi)
-
-        num_actors_image = sum([len(ann_hoi.actors) for ann_hoi in anns_hoi])
-        num_actors_video = sum([len(ann_sact.ids_actor) for ann_sact in anns_sact])
-        num_classes_actor = len(
-            set([actor.cid for ann_hoi in anns_hoi for actor in ann_hoi.actors])
+            partials = {name: values[rows_old] for name, values in partials_old.items()}
+            if is_new.any():
+                rows_new = rows_act[is_new]
+                partials_new = self._get_partials(np.split(rows_new, len(rows_new)))
+                for name, values in partials_new.items():
+                    partials[name][is_new] = values
+
+        with open_atomic(path_partials, "wb") as f:
+            np.savez(f, digests=digests, **partials)
+        return partials
+
+    def _compile(self, path_partials):
+        keys = ["all"] + [
+            f"{paradigm}_{split}"
+            for paradigm in self._lookup.retrieve("paradigms")
+            for split in self._lookup.retrieve("splits")
+        ]
+        groups, rows_act = concatenate_groups(
+            [self._lookup.retrieve("ids_act", dense=True)]
+            + [self._lookup.retrieve("ids_act", key, dense=True) for key in keys[1:]]
         )
-        num_objects_image = sum([len(ann_hoi.objects) for ann_hoi in anns_hoi])
-        num_objects_video = sum([len(ann_sact.ids_object) for ann_sact in anns_sact])
-        num_classes_object = len(
-            set([object.cid for ann_hoi in anns_hoi for object in ann_hoi.objects])
+        partials = _merge(
+            self._read_partials(path_partials), groups, rows_act, len(keys)
         )
+        return dict(zip(keys, self._curate(partials)))
 
-        num_atts = sum([len(ann_hoi.atts) for ann_hoi in anns_hoi])
-        num_classes_att = len(
-            set([att.cid for ann_hoi in anns_hoi for att in ann_hoi.atts])
+    def _read_statistics(self, dir_moma, reset_cache):
+        path_statistics = osp.join(dir_moma, "anns/cache/statistics.npz")
+        path_partials = osp.join(dir_moma, "anns/cache/statistics_partials.npz")
+
+        return load_or_compile(
+            path_statistics,
+            reset_cache,
+            self._load_cache,
+            lambda: self._compile(path_partials),
+            self._save_cache,
+            "Statistics",
+            paths_reset=[path_partials],
         )
-        num_rels = sum([len(ann_hoi.rels) for ann_hoi in anns_hoi])
-        num_classes_rel = len(
-            set([rel.cid for ann_hoi in anns_hoi for rel in ann_hoi.rels])
+
+    def _get_statistics(self, rows_act, rows_sact=None, rows_hoi=None):
+        """
+        Aggregates the statistics of groups of instances in a single pass over the columns.
+        Groups are expanded over the MOMA hierarchy with ``expand_groups()``.
+
+        :param rows_act: the dense IDs of the activities in each group
+        :type rows_act: list[numpy.ndarray]
+        :param rows_sact: the dense IDs of the sub-activities in each group
+        :type rows_sact: Optional[list[numpy.ndarray]]
+        :param rows_hoi: the dense IDs of the higher-order interactions in each group
+        :type rows_hoi: Optional[list[numpy.ndarray]]
+        :return: the statistics of each group
+        :rtype: list[dict]
+        """
+        return self._curate(self._get_partials(rows_act, rows_sact, rows_hoi))
+
+    def _get_partials(self, rows_act, rows_sact=None, rows_hoi=None):
+        """
+        Aggregates the partial statistics of groups of instances, which hold counts and the
+        total, minimum and maximum durations so that the partials of several groups can be
+        merged with ``_merge()``. Arguments are those of ``_get_statistics()``.
+
+        :return: arrays with a row per group
+        :rtype: dict
+        """
+        columns = self._lookup.columns
+        num_groups = len(rows_act)
+        (groups_act, rows_act), (groups_sact, rows_sact), (groups_hoi, rows_hoi) = (
+            expand_groups(columns, rows_act, rows_sact, rows_hoi)
         )
 
-        # durations
-        duration_total_raw = sum(metadatum.duration for metadatum in metadata)
-        (
-            duration_total_act,
-            duration_avg_act,
-            duration_min_act,
-            duration_max_act,
-        ) = self._get_duration(anns_act)
-        (
-            duration_total_sact,
-            duration_avg_sact,
-            duration_min_sact,
-            duration_max_sact,
-        ) = self._get_duration(anns_sact)
+        groups_entity, rows_entity = get_children_grouped(
+            columns["hoi_entity_offsets"], groups_hoi, rows_hoi
+        )
+        is_actor = columns["entity_kind"][rows_entity] == 0
+        cids = {
+            "act": columns["act_cid"][rows_act],
+            "sact": columns["sact_cid"][rows_sact],
+            "actor": columns["entity_cid"][rows_entity][is_actor],
+            "object": columns["entity_cid"][rows_entity][~is_actor],
+        }
+        groups = {
+            "act": groups_act,
+            "sact": groups_sact,
+            "actor": groups_entity[is_actor],
+            "object": groups_entity[~is_actor],
+        }
+        for kind in ["att", "rel"]:
+            groups[kind], rows = get_children_grouped(
+                columns[f"hoi_{kind}_offsets"], groups_hoi, rows_hoi
+            )
+            cids[kind] = columns[f"{kind}_cid"][rows]
 
         # class distributions
-        bincount_act = np.bincount(
-            [ann_act.cid for ann_act in anns_act], minlength=len(self._taxonomy["act"])
-        ).tolist()
-        bincount_sact = np.bincount(
-            [ann_sact.cid for ann_sact in anns_sact],
-            minlength=len(self._taxonomy["sact"]),
-        ).tolist()
-        (
-            bincount_actor,
-            bincount_object,
-            bincount_att,
-            bincount_rel,
-        ) = ([], [], [], [])
-        for ann_hoi in anns_hoi:
-            bincount_actor += [actor.cid for actor in ann_hoi.actors]
-            bincount_object += [object.cid for object in ann_hoi.objects]
-            bincount_att += [att.cid for att in ann_hoi.atts]
-            bincount_rel += [rel.cid for rel in ann_hoi.rels]
-        bincount_actor = np.bincount(
-            bincount_actor, minlength=len(self._taxonomy["actor"])
-        ).tolist()
-        bincount_object = np.bincount(
-            bincount_object, minlength=len(self._taxonomy["object"])
-        ).tolist()
-        bincount_att = np.bincount(
-            bincount_att, minlength=len(self._taxonomy["att"])
-        ).tolist()
-        bincount_rel = np.bincount(
-            bincount_rel, minlength=len(self._taxonomy["rel"])
-        ).tolist()
-
-        # curate statistics
-        statistics = {
-            "raw": {"duration_total": duration_total_raw},
-            "act": {
-                "num_instances": num_acts,
-                "num_classes": num_classes_act,
-                "duration_avg": duration_avg_act,
-                "duration_min": duration_min_act,
-                "duration_max": duration_max_act,
-                "duration_total": duration_total_act,
-                "distribution": bincount_act,
-            },
-            "sact": {
-                "num_instances": num_sacts,
-                "num_classes": num_classes_sact,
-                "duration_avg": duration_avg_sact,
-                "duration_min": duration_min_sact,
-                "duration_max": duration_max_sact,
-                "duration_total": duration_total_sact,
-                "distribution": bincount_sact,
-            },
-            "hoi": {"num_instances": num_hois,},
-            "actor": {
-                "num_instances_image": num_actors_image,
-                "num_instances_video": num_actors_video,
-                "num_classes": num_classes_actor,
-                "distribution": bincount_actor,
-            },
-            "object": {
-                "num_instances_image": num_objects_image,
-                "num_instances_video": num_objects_video,
-                "num_classes": num_classes_object,
-                "distribution": bincount_object,
-            },
-            "att": {
-                "num_instances": num_atts,
-                "num_classes": num_classes_att,
-                "distribution": bincount_att,
-            },
-            "rel": {
-                "num_instances": num_rels,
-                "num_classes": num_classes_rel,
-                "distribution": bincount_rel,
-            },
+        partials = {
+            f"distribution.{kind}": _count(
+                groups[kind], cids[kind], num_groups, len(self._taxonomy[kind])
+            )
+            for kind in cids
         }
 
-        return statistics
-
-    def keys(self):
-        return self.statistics.keys()
-
-    def values(self):
-        raise NotImplementedError
-
-    def items(self):
-        raise NotImplementedError
+        # durations
+        partials["duration_raw"] = np.bincount(
+            groups_act, columns["act_duration_raw"][rows_act], minlength=num_groups
+        )
+        for kind, groups_kind, rows in [
+            ("act", groups_act, rows_act),
+            ("sact", groups_sact, rows_sact),
+        ]:
+            durations = columns[f"{kind}_end"][rows] - columns[f"{kind}_start"][rows]
+            partials[f"duration.{kind}"] = np.stack(
+                _reduce(groups_kind, durations, durations, durations, num_groups),
+                axis=1,
+            )
 
-    def __getitem__(self, key):
-        return self.statistics[key]
+        # numbers of entity instances across the frames of a sub-activity
+        for kind in ["actor", "object"]:
+            nums = columns[f"sact_num_{kind}s"][rows_sact]
+            partials[f"num_video.{kind}"] = np.bincount(
+                groups_sact, nums, minlength=num_groups
+            ).astype(np.int64)
+        partials["num_hoi"] = np.bincount(groups_hoi, minlength=num_groups)
+
+        return partials
+
+    def _curate(self, partials):
+        """
+        :param partials: partial statistics with a row per group
+        :type partials: dict
+        :return: the statistics of each group
+        :rtype: list[dict]
+        """
+        statistics = []
+        for i in range(len(partials["num_hoi"])):
+            duration_raw = partials["duration_raw"][i].item()
+            statistics_group = {"raw": {"duration_total": duration_raw}}
+            for kind in ["act", "sact"]:
+                distribution = partials[f"distribution.{kind}"][i]
+                duration_total, duration_min, duration_max = partials[
+                    f"duration.{kind}"
+                ][i]
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    duration_avg = duration_total / np.float64(distribution.sum())
+                statistics_group[kind] = {
+                    "num_instances": int(distribution.sum()),
+                    "num_classes": int(np.count_nonzero(distribution)),
+                    "duration_avg": duration_avg.item(),
+                    "duration_min": duration_min.item(),
+                    "duration_max": duration_max.item(),
+                    "duration_total": duration_total.item(),
+                    "distribution": distribution,
+                }
+            statistics_group["hoi"] = {"num_instances": partials["num_hoi"][i].item()}
+            for kind in ["actor", "object"]:
+                distribution = partials[f"distribution.{kind}"][i]
+                statistics_group[kind] = {
+                    "num_instances_image": int(distribution.sum()),
+                    "num_instances_video": int(partials[f"num_video.{kind}"][i]),
+                    "num_classes": int(np.count_nonzero(distribution)),
+                    "distribution": distribution,
+                }
+            for kind in ["att", "rel"]:
+                distribution = partials[f"distribution.{kind}"][i]
+                statistics_group[kind] = {
+                    "num_instances": int(distribution.sum()),
+                    "num_classes": int(np.count_nonzero(distribution)),
+                    "distribution": distribution,
+                }
+            statistics.append(statistics_group)
 
-    def __len__(self):
-        return len(self.statistics.keys())
+        return statistics
 
-    def __repr__(self):
-        return repr(self.statistics)
+    def _get_data(self):
+        return self.statistics
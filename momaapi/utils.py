@@ -1,8 +1,20 @@
 import contextlib
 from functools import wraps
+import glob
+import hashlib
+import json
 import os
+import os.path as osp
 import time
 
+from .version import __version__
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
 
 def timeit(f):
     @wraps(f)
@@ -23,3 +35,171 @@ def supress_stdout(func):
                 return func(*a, **ka)
 
     return wrapper
+
+
+@contextlib.contextmanager
+def lock_file(path, shared=False):
+    """
+    Holds a lock on a file across processes for the duration of the context. Other processes
+    block until the lock is released, except that several processes can hold a shared lock
+    at once. On Windows, a shared lock is exclusive.
+    """
+    os.makedirs(osp.dirname(path), exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # gives up after 10 seconds
+                    continue
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        os.close(fd)
+
+
+@contextlib.contextmanager
+def open_atomic(path, mode="w"):
+    """
+    Opens a temporary file that replaces the file at ``path`` once written without errors,
+    so that concurrent readers never observe a partially written file
+    """
+    path_tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        with open(path_tmp, mode) as f:
+            yield f
+        os.replace(path_tmp, path)
+    finally:
+        if osp.exists(path_tmp):
+            os.remove(path_tmp)
+
+
+def load_or_compile(path, reset_cache, load, compile, save, name, paths_reset=()):
+    """
+    Loads a cache file, or compiles and saves it if it is missing or stale. Exactly one process
+    compiles, while the others wait for its lock, which is held next to the cache, and load
+    its cache.
+
+    :param load: returns the contents of the cache at a path, or None if they are stale
+    :param compile: returns the contents of a new cache
+    :param save: saves contents to a path
+    :param name: the name of the compiled class
+    :param paths_reset: further cache files removed if ``reset_cache``
+    """
+    value = None
+    if not reset_cache and osp.exists(path):
+        value = load(path)
+
+    if value is None:
+        with lock_file(f"{osp.splitext(path)[0]}.lock"):
+            if reset_cache:
+                for path_reset in [path, *paths_reset]:
+                    if osp.exists(path_reset):
+                        os.remove(path_reset)
+            elif osp.exists(path):
+                value = load(path)
+
+            if value is None:
+                print(f"Compiling the {name} class...")
+                value = compile()
+                save(path, value)
+
+    return value
+
+
+def get_fingerprint(dir_moma):
+    """
+    Returns a digest of the annotation sources (anns.json, the taxonomy and split files, and the
+    clip timestamps) and the API version. File contents are only hashed when the sizes or
+    modification times differ from the stamp saved in anns/cache, so that a warm call does
+    not open any of the sources.
+    """
+    paths = (
+        [osp.join(dir_moma, "anns/anns.json")]
+        + sorted(glob.glob(osp.join(dir_moma, "anns/taxonomy/*.json")))
+        + sorted(glob.glob(osp.join(dir_moma, "anns/splits/*.json")))
+        + [osp.join(dir_moma, "videos/interaction_frames/timestamps.json")]
+    )
+    stats = [__version__]
+    for path in paths:
+        if osp.exists(path):
+            stat = os.stat(path)
+            stats.append([osp.relpath(path, dir_moma), stat.st_size, stat.st_mtime_ns])
+        else:
+            stats.append([osp.relpath(path, dir_moma), None, None])
+
+    path_stamp = osp.join(dir_moma, "anns/cache/fingerprint.json")
+    if osp.exists(path_stamp):
+        with open(path_stamp, "r") as f:
+            stamp = json.load(f)
+        if stamp["stats"] == stats:
+            return stamp["digest"]
+
+    digest = hashlib.sha1(__version__.encode())
+    for path in paths:
+        digest.update(osp.relpath(path, dir_moma).encode())
+        if osp.exists(path):
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(2**20), b""):
+                    digest.update(chunk)
+        else:
+            digest.update(b"\0")
+    digest = digest.hexdigest()
+
+    os.makedirs(osp.dirname(path_stamp), exist_ok=True)
+    with open_atomic(path_stamp, "w") as f:
+        json.dump({"stats": stats, "digest": digest}, f)
+
+    return digest
+
+
+def iter_json_array(path, size_chunk=2**20):
+    """
+    Iterates over the elements of a JSON array stored in a file. The file is read in chunks so
+    that only the element being decoded is held in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        buffer, eof = "", False
+
+        def read(buffer, size):
+            chunk = f.read(size)
+            return (buffer + chunk).lstrip(), len(chunk) == 0
+
+        while not buffer and not eof:
+            buffer, eof = read(buffer, size_chunk)
+        assert buffer.startswith("["), f"{path} does not contain a JSON array"
+        buffer = buffer[1:].lstrip()
+
+        while True:
+            while not buffer and not eof:
+                buffer, eof = read(buffer, size_chunk)
+            if buffer.startswith("]"):
+                return
+
+            try:
+                element, end = decoder.raw_decode(buffer)
+                # a number cut at a chunk boundary decodes as a shorter number, so an
+                # element is only complete once the delimiter after it is buffered
+                rest = buffer[end:].lstrip()
+                if not rest.startswith((",", "]")):
+                    raise json.JSONDecodeError("Expecting ',' delimiter", buffer, end)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                buffer, eof = read(buffer, max(size_chunk, len(buffer)))
+                continue
+
+            yield element
+
+            buffer = rest
+            if buffer.startswith(","):
+                buffer = buffer[1:].lstrip()
@@ -1,4 +1,28 @@
-from .ann import AnnVisualizer
-from .stat import StatVisualizer
-from .timeline import TimelineVisualizer
-from .utils import *
+import importlib
+
+"""
+Each visualizer is imported on first access, so that a visualizer only requires its own
+plotting dependencies.
+"""
+
+_name_to_module = {
+    "AnnVisualizer": ".ann",
+    "StatVisualizer": ".stat",
+    "TimelineVisualizer": ".timeline",
+    "distance": ".utils",
+    "get_dist_per_class": ".utils",
+    "get_dist_overall": ".utils",
+}
+
+__all__ = list(_name_to_module.keys())
+
+
+def __getattr__(name):
+    if name in _name_to_module:
+        module = importlib.import_module(_name_to_module[name], __name__)
+        return getattr(module, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals().keys()) + __all__)
@@ -1,4 +1,5 @@
 import matplotlib.pyplot as plt
+import numpy as np
 import os
 import os.path as osp
 from pprint import pprint
@@ -23,10 +24,12 @@ class StatVisualizer:
         if with_split:
             distributions, hues = {}, {}
             for key in keys:
-                distributions[key] = (
-                    self.moma.statistics["standard_train"][key]["distribution"]
-                    + self.moma.statistics["standard_val"][key]["distribution"]
-                    + self.moma.statistics["standard_test"][key]["distribution"]
+                distributions[key] = np.concatenate(
+                    [
+                        self.moma.statistics["standard_train"][key]["distribution"],
+                        self.moma.statistics["standard_val"][key]["distribution"],
+                        self.moma.statistics["standard_test"][key]["distribution"],
+                    ]
                 )
                 hues[key] = (
                     ["train"]
@@ -1,15 +1,248 @@
 import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import os.path as osp
+import subprocess
+import sys
+import time
+
+import numpy as np
 
 from momaapi import MOMA
+from momaapi.utils import open_atomic
+
+"""
+Verifies the MOMA-LRG API and the dataset layout.
+
+The files expected in videos/ are derived from the annotations. Each file is checked for
+existence and, against a manifest of file sizes and digests (videos/manifest.json), for
+corruption. The manifest is created, or updated, with --update-manifest. Digests are computed
+from the size and the first and last 64 KB of a file unless --full-hash is given, so that
+a dataset of several hundred GB is verified in minutes. File headers are checked with
+--check-headers. A missing directory of videos/ is an error unless --skip-missing-dirs is
+given, e.g., for a partial download. The outcome of every check is saved as a JSON report
+with --report.
+
+Importing the API is also timed, and must not import the plotting dependencies of the
+visualizers.
+"""
+
+size_chunk = 2**16
+magics = {".mp4": (4, b"ftyp"), ".jpg": (0, b"\xff\xd8\xff")}
+modules_vis = [
+    "matplotlib",
+    "seaborn",
+    "torchvision",
+    "pygraphviz",
+    "distinctipy",
+    "scipy",
+]
+
+
+def verify_import():
+    code = (
+        "import sys, time; time_start = time.perf_counter(); import momaapi; "
+        "print(time.perf_counter() - time_start); print(' '.join(sys.modules))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    modules = set(x.split(".")[0] for x in output[1].split())
+    assert not any(x in modules for x in modules_vis), modules & set(modules_vis)
+    print(f"Importing momaapi takes {float(output[0]):.3f}s")
 
 
 def verify_api(args):
-    moma = MOMA(args.dir_moma)
+    # components are constructed on first use, so they are only verified once warmed
+    moma = MOMA(args.dir_moma).warm()
+    return moma
+
+
+def get_expected_paths(moma):
+    """
+    Returns the paths to the files that the annotations refer to, grouped by directory
+    """
+    ids_act = sorted(moma.lookup.retrieve("ids_act"))
+    ids_sact = sorted(moma.lookup.retrieve("ids_sact"))
+    ids_hoi = sorted(moma.lookup.retrieve("ids_hoi"))
+    ids_hoi_clip = sorted(moma.lookup.id_hoi_to_clip.keys())
+
+    paths_frame = set()
+    for id_hoi_clip in ids_hoi_clip:
+        paths = moma.get_paths(id_hoi_clip=id_hoi_clip, sanity_check=False)
+        paths_frame.update(x for x in paths if "/interaction_frames/" in x)
+
+    dirname_to_paths = {
+        "activity": moma.get_paths(ids_act=ids_act, sanity_check=False),
+        "activity_fr": moma.get_paths(
+            ids_act=ids_act, full_res=True, sanity_check=False
+        ),
+        "sub_activity": moma.get_paths(ids_sact=ids_sact, sanity_check=False),
+        "sub_activity_fr": moma.get_paths(
+            ids_sact=ids_sact, full_res=True, sanity_check=False
+        ),
+        "interaction": moma.get_paths(ids_hoi=ids_hoi, sanity_check=False),
+        "interaction_frames": sorted(paths_frame),
+    }
+    return dirname_to_paths
+
+
+def get_digest(path, full_hash):
+    """
+    Returns the SHA-1 digest of a file, or of its size and its first and last chunks
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if full_hash or size <= 2 * size_chunk:
+            for chunk in iter(lambda: f.read(size_chunk), b""):
+                digest.update(chunk)
+        else:
+            digest.update(str(size).encode())
+            digest.update(f.read(size_chunk))
+            f.seek(-size_chunk, os.SEEK_END)
+            digest.update(f.read(size_chunk))
+    return digest.hexdigest()
+
+
+def check_header(path):
+    """
+    Checks the magic bytes of an MP4 video or a JPEG image, and that a JPEG image is not
+    truncated
+    """
+    ext = osp.splitext(path)[1]
+    if ext not in magics:
+        return True
+
+    offset, magic = magics[ext]
+    with open(path, "rb") as f:
+        head = f.read(offset + len(magic))
+        if head[offset:] != magic:
+            return False
+        if ext == ".jpg":
+            f.seek(max(os.fstat(f.fileno()).st_size - size_chunk, 0))
+            return f.read().rstrip(b"\0").endswith(b"\xff\xd9")
+    return True
+
+
+def _verify_file(args):
+    path, is_hashed, is_header_checked, full_hash = args
+    try:
+        digest = get_digest(path, full_hash) if is_hashed else None
+        is_header_ok = check_header(path) if is_header_checked else True
+    except OSError:
+        return path, None, True, False
+    return path, digest, is_header_ok, True
+
+
+def verify_dataset(args, moma):
+    dir_videos = osp.join(args.dir_moma, "videos")
+    path_manifest = osp.join(dir_videos, "manifest.json")
 
+    # the digests of an existing manifest are compared in the mode they were computed in
+    manifest = {"full_hash": args.full_hash, "files": {}}
+    if osp.exists(path_manifest) and not args.update_manifest:
+        with open(path_manifest, "r") as f:
+            manifest = json.load(f)
+    full_hash = manifest["full_hash"]
+    is_hashed = args.update_manifest or len(manifest["files"]) > 0
 
-def verify_dataset():
-    # TODO: verify dataset layout
-    pass
+    # existence and sizes are checked against a single listing of each directory
+    report = {"dir_moma": args.dir_moma, "full_hash": full_hash, "dirs": {}}
+    tasks = []
+    for dirname, paths in get_expected_paths(moma).items():
+        if not osp.isdir(osp.join(dir_videos, dirname)):
+            status = "skipped" if args.skip_missing_dirs else "missing"
+            report["dirs"][dirname] = {"status": status, "num_expected": len(paths)}
+            continue
+
+        sizes = moma.files.get_sizes(paths)
+        sizes_manifest = np.array(
+            [
+                manifest["files"].get(osp.relpath(path, dir_videos), [-1])[0]
+                for path in paths
+            ]
+        )
+        is_missing = sizes < 0
+        is_size_mismatch = (
+            ~is_missing & (sizes_manifest >= 0) & (sizes != sizes_manifest)
+        )
+        report["dirs"][dirname] = {
+            "status": "checked",
+            "num_expected": len(paths),
+            "missing": [paths[i] for i in np.flatnonzero(is_missing)],
+            "size_mismatch": [paths[i] for i in np.flatnonzero(is_size_mismatch)],
+            "hash_mismatch": [],
+            "bad_header": [],
+            "unreadable": [],
+        }
+        if args.update_manifest:
+            for path, size in zip(paths, sizes.tolist()):
+                if size >= 0:
+                    manifest["files"][osp.relpath(path, dir_videos)] = [size, None]
+
+        for i in np.flatnonzero(~is_missing & ~is_size_mismatch):
+            tasks.append((paths[i], is_hashed, args.check_headers, full_hash))
+
+    # digests and headers are checked across a process pool
+    path_to_dirname = {x[0]: osp.basename(osp.dirname(x[0])) for x in tasks}
+    time_start, time_last = time.time(), 0
+    with multiprocessing.Pool(args.jobs) as pool:
+        results = pool.imap_unordered(_verify_file, tasks, chunksize=64)
+        for i, (path, digest, is_header_ok, is_readable) in enumerate(results):
+            if time.time() - time_last > 1 or i + 1 == len(tasks):
+                time_last = time.time()
+                print(
+                    f"\rVerifying files: {i + 1}/{len(tasks)} "
+                    f"({time_last - time_start:.0f}s)",
+                    end="",
+                    file=sys.stderr,
+                )
+
+            report_dir = report["dirs"][path_to_dirname[path]]
+            key = osp.relpath(path, dir_videos)
+            if not is_readable:
+                report_dir["unreadable"].append(path)
+            elif args.update_manifest:
+                manifest["files"][key][1] = digest
+            elif key in manifest["files"] and manifest["files"][key][1] != digest:
+                report_dir["hash_mismatch"].append(path)
+            if not is_header_ok:
+                report_dir["bad_header"].append(path)
+    if len(tasks) > 0:
+        print(file=sys.stderr)
+
+    if args.update_manifest:
+        with open_atomic(path_manifest, "w") as f:
+            json.dump(manifest, f)
+
+    num_errors = 0
+    for dirname, report_dir in report["dirs"].items():
+        if report_dir["status"] == "skipped":
+            print(f"{dirname}: skipped, the directory does not exist")
+            continue
+        elif report_dir["status"] == "missing":
+            num_errors += 1
+            print(f"{dirname}: missing, the directory does not exist")
+            continue
+        errors = {
+            key: len(value)
+            for key, value in report_dir.items()
+            if isinstance(value, list)
+        }
+        for key in errors:
+            report_dir[key] = sorted(report_dir[key])
+        num_errors += sum(errors.values())
+        print(f"{dirname}: {report_dir['num_expected']} files, {errors}")
+    report["num_errors"] = num_errors
+
+    if args.report is not None:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+    return num_errors == 0
 
 
 def main():
@@ -17,10 +250,39 @@ def main():
     parser.add_argument(
         "-d", "--dir-moma", type=str, default="/home/alan/data/moma-lrg"
     )
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=os.cpu_count(), help="number of processes"
+    )
+    parser.add_argument(
+        "--update-manifest",
+        action="store_true",
+        help="record the sizes and digests of the files in videos/manifest.json",
+    )
+    parser.add_argument(
+        "--full-hash",
+        action="store_true",
+        help="hash entire files rather than their size and first and last chunks",
+    )
+    parser.add_argument(
+        "--check-headers",
+        action="store_true",
+        help="check the magic bytes of videos and images and that images are complete",
+    )
+    parser.add_argument(
+        "--skip-missing-dirs",
+        action="store_true",
+        help="skip directories of videos/ that do not exist instead of failing",
+    )
+    parser.add_argument(
+        "--report", type=str, default=None, help="path to save a JSON report to"
+    )
     args = parser.parse_args()
 
-    verify_api(args)
-    verify_dataset()
+    verify_import()
+    moma = verify_api(args)
+    if not verify_dataset(args, moma):
+        print("Dataset verification failed.")
+        sys.exit(1)
 
     print("Dataset and API are verified.")
 
@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from momaapi.utils import iter_json_array
+
+ELEMENTS = [12345, 67, -8.5e-3, "ab", {"a": [1, 2]}, [], True, None, 9]
+
+
+@pytest.mark.parametrize("size_chunk", [1, 2, 3, 4, 2**20])
+@pytest.mark.parametrize("separators", [(",", ":"), (", ", ": ")])
+def test_iter_json_array(tmp_path, size_chunk, separators):
+    path = tmp_path / "array.json"
+    path.write_text(json.dumps(ELEMENTS, separators=separators))
+    assert list(iter_json_array(path, size_chunk)) == ELEMENTS
+
+
+@pytest.mark.parametrize("size_chunk", [1, 3, 2**20])
+def test_iter_json_array_empty(tmp_path, size_chunk):
+    path = tmp_path / "array.json"
+    path.write_text(" [ ] ")
+    assert list(iter_json_array(path, size_chunk)) == []
+
+
+@pytest.mark.parametrize("size_chunk", [1, 3, 2**20])
+def test_iter_json_array_truncated(tmp_path, size_chunk):
+    path = tmp_path / "array.json"
+    path.write_text("[123, 45")
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_array(path, size_chunk))
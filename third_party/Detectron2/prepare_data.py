@@ -6,10 +6,12 @@ from distinctipy import distinctipy
 def create_dataset(moma, ids_hoi, kind, cname_to_cid):
     records = []
 
-    for id_hoi in ids_hoi:
+    # paths and parent activities are looked up in batch
+    image_paths = moma.get_paths(ids_hoi=ids_hoi)
+    ids_act = moma.lookup.map_ids("act", ids_hoi=ids_hoi)
+
+    for id_hoi, image_path, id_act in zip(ids_hoi, image_paths, ids_act):
         ann_hoi = moma.get_anns_hoi([id_hoi])[0]
-        image_path = moma.get_paths(ids_hoi=[id_hoi])[0]
-        id_act = moma.get_ids_act(ids_hoi=[id_hoi])[0]
         metadatum = moma.get_metadata(ids_act=[id_act])[0]
 
         if kind is None: